@@ -1,10 +1,12 @@
-from typing import Callable
+from typing import AsyncGenerator, Callable
 
-from app.db.database import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.database import AsyncSessionLocal
 
-def get_db():
-    with SessionLocal() as db:
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
         yield db
 
 
@@ -6,15 +6,18 @@ from typing import Any, List, Annotated
 from fastapi.responses import JSONResponse, RedirectResponse, Response
 
 from app.api.dependencies.db import get_db, get_service
-from app.core.config import ACCESS_TOKEN_EXPIRE_MINUTES, JWT_TOKEN_PREFIX
+from app.core.config import ACCESS_TOKEN_EXPIRE_MINUTES, JWT_TOKEN_PREFIX, INTROSPECT_BATCH_MAX_SIZE
 from app.db.domain.users import UserInDB, User, Role
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request
 
 from app.schemas.users import UserResponse, UserList, UserInCreate, UserUpdate, UserInLogin, UserOutLogin, Token, \
-    ChangePasswordOut, ChangePasswordIn
+    ChangePasswordOut, ChangePasswordIn, RefreshTokenIn, TokenData, IntrospectBatchIn, IntrospectBatchOut
 from app.services.security import oauth2_scheme
-from app.services.users import UsersService, get_current_user, get_current_active_user
+from app.services.throttling import login_throttle
+from app.services.users import (UsersService, get_current_user, get_current_active_user, claims_cache, user_cache,
+                                unknown_usernames)
 from app.utils import constants as const
+from app.utils.serialization import RawJSONResponse
 
 router = APIRouter()
 
@@ -26,20 +29,38 @@ router = APIRouter()
     name="auth:login"
 )
 async def login(
+        request: Request,
         user: UserInLogin,
         user_service: UsersService = Depends(get_service(UsersService))
 ):
-    user_db = user_service.get_user_by_username(user.username)
-    if not user_db or not user_service.check_password(user_db, user.password):
+    await login_throttle.check(user.username, request.client and request.client.host)
+    user_db = await user_service.authenticate(user.username, user.password)
+    if not user_db:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail=const.INCORRECT_LOGIN_INPUT
         )
-    if not user_db.is_active:
+    await login_throttle.reset(user.username)
+    return await user_service.create_tokens(user_db)
+
+
+@router.post(
+    path="/refresh",
+    status_code=status.HTTP_200_OK,
+    response_model=Token,
+    name="auth:refresh"
+)
+async def refresh(
+        body: RefreshTokenIn,
+        user_service: UsersService = Depends(get_service(UsersService))
+):
+    token = await user_service.refresh_tokens(body.refresh_token)
+    if token is None:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail=const.USER_NOT_FOUND
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=const.INVALID_REFRESH_TOKEN,
+            headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = user_service.create_access_token(user_db)
-    return Token(access_token=access_token, token_type=JWT_TOKEN_PREFIX)
+    return token
 
 
 @router.post(
@@ -48,10 +69,12 @@ async def login(
     response_model=Token
 )
 async def login_for_access_token(
+        request: Request,
         form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
         user_service: UsersService = Depends(get_service(UsersService))
 ):
-    user_db = user_service.get_user_by_username(form_data.username)
+    await login_throttle.check(form_data.username, request.client and request.client.host)
+    user_db = await user_service.authenticate(form_data.username, form_data.password)
     if not user_db:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -63,6 +86,22 @@ async def login_for_access_token(
     return {"access_token": access_token, "token_type": JWT_TOKEN_PREFIX}
 
 
+@router.post(
+    "/introspect/batch",
+    response_model=IntrospectBatchOut,
+    status_code=status.HTTP_200_OK,
+    name="auth:introspect-batch"
+)
+async def introspect_batch(
+        body: IntrospectBatchIn,
+        user_service: UsersService = Depends(get_service(UsersService))
+):
+    if len(body.tokens) > INTROSPECT_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=const.BATCH_TOO_LARGE)
+    results = await user_service.introspect_tokens(body.tokens)
+    return IntrospectBatchOut(results=results)
+
+
 @router.get(
     "/me",
     response_model=UserResponse,
@@ -70,9 +109,18 @@ async def login_for_access_token(
     name="users:get-current-user"
 )
 async def profile(
-        current_user: User = Depends(get_current_active_user)
+        user_service: UsersService = Depends(get_service(UsersService)),
+        token_data: TokenData = Depends(get_current_user)
 ):
-    return current_user
+    # the cached snapshot is the response body, one cache lookup and no parsing
+    user = await user_service.get_user_snapshot_json(user_id=token_data.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return RawJSONResponse(user)
 
 
 @router.post(
@@ -84,7 +132,7 @@ async def create_role(
         role: Role,
         user_service: UsersService = Depends(get_service(UsersService))
 ):
-    result = user_service.create_role(user_id, role)
+    result = await user_service.create_role(user_id, role)
     return result
 
 
@@ -95,6 +143,31 @@ async def create_role(
 async def change_password(
         password: Annotated[ChangePasswordIn, Body(...)],
         user_service: UsersService = Depends(get_service(UsersService)),
-        current_user: User = Depends(get_current_active_user)
+        current_user: TokenData = Depends(get_current_active_user),
+        token_data: TokenData = Depends(get_current_user)
 ):
-    return user_service.change_password(current_user.id, password)
+    result = await user_service.change_password(current_user.id, password)
+    await user_service.revoke_token(token_data)
+    return result
+
+
+@router.post(
+    "/logout",
+    status_code=status.HTTP_200_OK,
+    name="auth:logout"
+)
+async def logout(
+        user_service: UsersService = Depends(get_service(UsersService)),
+        token_data: TokenData = Depends(get_current_user)
+) -> Response:
+    await user_service.revoke_token(token_data)
+    return JSONResponse(status_code=status.HTTP_200_OK, content={'detail': const.TOKEN_REVOKED})
+
+
+@router.get(
+    "/cache/stats",
+    status_code=status.HTTP_200_OK,
+    name="auth:cache-stats"
+)
+async def cache_stats():
+    return {"claims": claims_cache.stats(), "users": user_cache.stats(), "unknown_usernames": unknown_usernames.stats()}
@@ -3,6 +3,7 @@ from pydantic import EmailStr
 from fastapi.responses import JSONResponse, RedirectResponse, Response
 
 from app.schemas.email import ChangeEmailOut
+from app.schemas.users import UserUpdate
 from app.services.users import UsersService
 from app.api.dependencies.db import get_service
 from app.services.users import get_current_user
@@ -20,9 +21,9 @@ async def input_email(
         current_user=Depends(get_current_user),
         user_service: UsersService = Depends(get_service(UsersService))
 ):
-    current_user.email = email
     # user_service.check_user_attrs(current_user.id, **{"email": email})
-    user_service.update_user(current_user.id, current_user)
+    user = await user_service.update_user(current_user.id, UserUpdate(email=email))
+    user_service.get_user_or_raise_error(user)
     return ChangeEmailOut(email=email)
 
 
@@ -4,17 +4,22 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from typing import Any, List, Annotated
 
-from fastapi.responses import JSONResponse, RedirectResponse, Response
+from fastapi.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
 
 from app.api.dependencies.db import get_db, get_service
-from app.core.config import ACCESS_TOKEN_EXPIRE_MINUTES, JWT_TOKEN_PREFIX
+from app.core.config import ACCESS_TOKEN_EXPIRE_MINUTES, JWT_TOKEN_PREFIX, REGISTER_BATCH_MAX_SIZE
 from app.db.domain.users import UserInDB, User
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
 
-from app.schemas.users import UserResponse, UserList, UserInCreate, UserUpdate, UserInLogin, UserOutLogin, Token
+from app.schemas.users import UserResponse, UserList, UserInCreate, UserUpdate, UserInLogin, UserOutLogin, Token, \
+    UserPage, UserBatchResult, user_response_adapter, user_list_adapter, user_page_adapter
 from app.services.security import oauth2_scheme
 from app.services.users import UsersService, get_current_user, get_current_active_user
 from app.utils import constants as const
+from app.utils.choices import ExportFormatChoices, BatchItemStatusChoices
+from app.utils.export import to_csv, to_ndjson
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.serialization import RawJSONResponse
 
 router = APIRouter()
 
@@ -29,25 +34,73 @@ async def register(
         user: UserInCreate,
         user_service: UsersService = Depends(get_service(UsersService))
 ):
-    if user_service.get_user_by_username(user.username):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=const.USERNAME_TAKEN)
-    user = user_service.create_user(user)
+    user = await user_service.create_user(user)
     return user
 
 
+@router.post(
+    "/register/batch",
+    response_model=UserBatchResult,
+    status_code=status.HTTP_200_OK,
+    name="auth:register-batch"
+)
+async def register_batch(
+        users: List[UserInCreate],
+        user_service: UsersService = Depends(get_service(UsersService))
+):
+    if len(users) > REGISTER_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=const.BATCH_TOO_LARGE)
+    results = await user_service.create_users(users)
+    created = sum(result["status"] == BatchItemStatusChoices.CREATED for result in results)
+    return UserBatchResult(created=created, conflicts=len(results) - created, results=results)
+
+
 @router.get(
     "/list",
-    response_model=List[UserResponse],
+    response_model=List[UserResponse] | UserPage,
     status_code=status.HTTP_200_OK,
     name="users:list-users"
 )
 async def get_users(
         skip: int = 0,
         limit: int = 100,
+        after: str | None = None,
+        include_inactive: bool = False,
         user_service: UsersService = Depends(get_service(UsersService))
 ):
-    users = user_service.list_users(skip, limit)
-    return users
+    # response_model only documents the schema, rows are serialized without being validated again
+    if after is None:
+        users = await user_service.list_users(skip, limit, include_inactive)
+        return RawJSONResponse(user_list_adapter.dump_json([UserResponse.from_row(user) for user in users]))
+    # cursor mode, an empty ``after`` requests the first page
+    try:
+        after_id = decode_cursor(after)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=const.INVALID_CURSOR)
+    users = await user_service.list_users_after(after_id, limit, include_inactive)
+    next_cursor = encode_cursor(users[-1].id) if len(users) == limit and users else None
+    page = UserPage.model_construct(users=[UserResponse.from_row(user) for user in users], next_cursor=next_cursor)
+    return RawJSONResponse(user_page_adapter.dump_json(page))
+
+
+@router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    name="users:export-users"
+)
+async def export_users(
+        export_format: ExportFormatChoices = Query(ExportFormatChoices.NDJSON, alias="format"),
+        include_inactive: bool = False,
+        user_service: UsersService = Depends(get_service(UsersService)),
+):
+    users = user_service.export_users(include_inactive=include_inactive)
+    if export_format == ExportFormatChoices.CSV:
+        return StreamingResponse(
+            to_csv(users),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="users.csv"'},
+        )
+    return StreamingResponse(to_ndjson(users), media_type="application/x-ndjson")
 
 
 @router.get(
@@ -60,9 +113,9 @@ async def get_user_retrieve(
         user_id: int,
         user_service: UsersService = Depends(get_service(UsersService)),
 ):
-    user_db = user_service.get_user_by_id(user_id=user_id)
-    user_service.get_user_or_raise_error(user_db)
-    return user_db
+    user = await user_service.get_user_snapshot_json(user_id=user_id)
+    user_service.get_user_or_raise_error(user)
+    return RawJSONResponse(user)
 
 
 @router.put(
@@ -76,12 +129,9 @@ async def update_user(
         user: UserUpdate,
         user_service: UsersService = Depends(get_service(UsersService)),
 ):
-    user_db = user_service.get_user_by_id(user_id=user_id)
+    user_db = await user_service.update_user(user_id=user_id, user=user)
     user_service.get_user_or_raise_error(user_db)
-    if user_service.get_user_by_username(user.username):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=const.USERNAME_TAKEN)
-    user_db = user_service.update_user(user_id=user_id, user=user)
-    return user_db
+    return RawJSONResponse(user_response_adapter.dump_json(UserResponse.from_row(user_db)))
 
 
 @router.delete(
@@ -93,7 +143,6 @@ async def delete_user(
         user_id: int,
         user_service: UsersService = Depends(get_service(UsersService)),
 ) -> Response:
-    user_db = user_service.get_user_by_id(user_id=user_id)
+    user_db = await user_service.delete_user(user_id=user_id)
     user_service.get_user_or_raise_error(user_db)
-    user_service.delete_user(user_id=user_id)
     return JSONResponse(status_code=status.HTTP_200_OK, content={'detail': const.USER_SUCCESSFULLY_DELETED})
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import Response
+
+from app.core.config import JWKS_CACHE_MAX_AGE
+from app.services.security import get_jwks
+
+router = APIRouter()
+
+
+@router.get(
+    "/.well-known/jwks.json",
+    include_in_schema=False,
+    name="auth:jwks"
+)
+async def jwks(request: Request) -> Response:
+    document, etag = get_jwks()
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={JWKS_CACHE_MAX_AGE}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(document, media_type="application/json", headers=headers)
@@ -20,6 +20,15 @@ DEBUG: bool = config.get("DEBUG", cast=bool, default=False)
 DATABASE_URL: DatabaseURL = config.get("DB_CONNECTION", cast=DatabaseURL)
 MAX_CONNECTIONS_COUNT: int = config("MAX_CONNECTIONS_COUNT", cast=int, default=10)
 MIN_CONNECTIONS_COUNT: int = config("MIN_CONNECTIONS_COUNT", cast=int, default=10)
+DB_POOL_TIMEOUT: float = config("DB_POOL_TIMEOUT", cast=float, default=30)  # seconds to wait for a connection
+DB_POOL_RECYCLE: int = config("DB_POOL_RECYCLE", cast=int, default=1800)  # seconds, -1 disables recycling
+DB_POOL_PRE_PING: bool = config("DB_POOL_PRE_PING", cast=bool, default=True)
+# read replicas, comma separated URLs in the DB_CONNECTION format
+DB_REPLICA_CONNECTIONS: List[str] = list(config("DB_REPLICA_CONNECTIONS", cast=CommaSeparatedStrings, default=""))
+DB_REPLICA_HEALTH_CHECK_INTERVAL: float = config("DB_REPLICA_HEALTH_CHECK_INTERVAL", cast=float, default=10)  # seconds
+# reads of a user go to the primary this long after the user was written, covers replication lag;
+# with CACHE_BACKEND=memory only the worker that made the write knows, use shm or redis with several workers
+DB_REPLICA_PIN_SECONDS: float = config("DB_REPLICA_PIN_SECONDS", cast=float, default=10)
 
 SECRET_KEY: Secret = config.get("SECRET_KEY", cast=Secret)
 PROJECT_NAME: str = config.get("PROJECT_NAME", default="Auth service")
@@ -38,5 +47,64 @@ logger.configure(handlers=[{"sink": sys.stderr, "level": LOGGING_LEVEL}])
 
 # JWT configuration
 JWT_TOKEN_PREFIX = "Bearer"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # one week
-ALGORITHM = "HS256"
+# access tokens are trusted without a database lookup, their lifetime bounds revocation latency
+ACCESS_TOKEN_EXPIRE_MINUTES: int = config("ACCESS_TOKEN_EXPIRE_MINUTES", cast=int, default=15)
+REFRESH_TOKEN_EXPIRE_DAYS: int = config("REFRESH_TOKEN_EXPIRE_DAYS", cast=int, default=30)
+# HS256 signs with SECRET_KEY, RS256/ES256 sign with the private keys ``<kid>.pem`` in JWT_KEYS_DIR
+ALGORITHM: str = config("JWT_ALGORITHM", default="HS256")
+JWT_KEYS_DIR: str = config("JWT_KEYS_DIR", default="keys")
+# key used for new tokens, the other keys in JWT_KEYS_DIR stay valid for verification; defaults to the last kid
+JWT_ACTIVE_KID: str | None = config("JWT_ACTIVE_KID", default=None)
+JWKS_CACHE_MAX_AGE: int = config("JWKS_CACHE_MAX_AGE", cast=int, default=300)  # seconds
+
+REGISTER_BATCH_MAX_SIZE: int = config("REGISTER_BATCH_MAX_SIZE", cast=int, default=1000)
+INTROSPECT_BATCH_MAX_SIZE: int = config("INTROSPECT_BATCH_MAX_SIZE", cast=int, default=1000)
+
+# authentication cache configuration
+CLAIMS_CACHE_MAX_SIZE: int = config("CLAIMS_CACHE_MAX_SIZE", cast=int, default=10000)
+CLAIMS_CACHE_TTL: int = config("CLAIMS_CACHE_TTL", cast=int, default=300)  # seconds
+USER_CACHE_MAX_SIZE: int = config("USER_CACHE_MAX_SIZE", cast=int, default=10000)
+USER_CACHE_TTL: int = config("USER_CACHE_TTL", cast=int, default=60)  # seconds
+UNKNOWN_USERNAME_CACHE_MAX_SIZE: int = config("UNKNOWN_USERNAME_CACHE_MAX_SIZE", cast=int, default=100000)
+UNKNOWN_USERNAME_CACHE_TTL: int = config("UNKNOWN_USERNAME_CACHE_TTL", cast=int, default=60)  # seconds
+# where user caches live: memory (per worker), shm (shared by workers on the host) or redis
+CACHE_BACKEND: str = config("CACHE_BACKEND", default="memory")
+CACHE_SHM_DIR: str = config("CACHE_SHM_DIR", default="/dev/shm/auth-service")
+CACHE_REDIS_URL: str = config("CACHE_REDIS_URL", default="redis://localhost:6379/0")
+CACHE_REDIS_POOL_SIZE: int = config("CACHE_REDIS_POOL_SIZE", cast=int, default=8)  # connections per worker
+# in-process copy of redis entries, kept coherent through redis pub/sub, 0 disables it
+CACHE_NEAR_CACHE_SIZE: int = config("CACHE_NEAR_CACHE_SIZE", cast=int, default=10000)
+CACHE_NEAR_CACHE_TTL: float = config("CACHE_NEAR_CACHE_TTL", cast=float, default=5)  # seconds
+
+# token revocation configuration
+REVOCATION_FILTER_CAPACITY: int = config("REVOCATION_FILTER_CAPACITY", cast=int, default=100000)
+REVOCATION_FILTER_ERROR_RATE: float = config("REVOCATION_FILTER_ERROR_RATE", cast=float, default=0.001)
+REVOCATION_SYNC_INTERVAL: float = config("REVOCATION_SYNC_INTERVAL", cast=float, default=5)  # seconds
+# ids skipped by the sync are looked up again this long, covers inserts committing after later ones
+REVOCATION_SYNC_GAP_TIMEOUT: float = config("REVOCATION_SYNC_GAP_TIMEOUT", cast=float, default=60)  # seconds
+REVOCATION_PURGE_INTERVAL: float = config("REVOCATION_PURGE_INTERVAL", cast=float, default=3600)  # seconds
+
+# password hashing configuration
+PASSWORD_HASH_WORKERS: int = config("PASSWORD_HASH_WORKERS", cast=int, default=4)
+PASSWORD_HASH_MAX_PENDING: int = config("PASSWORD_HASH_MAX_PENDING", cast=int, default=64)
+# hashing workers a batch registration may keep busy, the others stay free for logins
+PASSWORD_HASH_BATCH_WORKERS: int = config(
+    "PASSWORD_HASH_BATCH_WORKERS", cast=int, default=max(1, PASSWORD_HASH_WORKERS // 2)
+)
+# first scheme hashes new passwords, hashes of the other schemes or with lower cost are upgraded on login
+PASSWORD_HASH_SCHEMES: List[str] = list(config("PASSWORD_HASH_SCHEMES", cast=CommaSeparatedStrings, default="bcrypt"))
+BCRYPT_ROUNDS: int = config("BCRYPT_ROUNDS", cast=int, default=12)  # log2 of iterations
+ARGON2_ROUNDS: int = config("ARGON2_ROUNDS", cast=int, default=3)  # time cost, argon2 needs argon2-cffi
+ARGON2_MEMORY_COST: int = config("ARGON2_MEMORY_COST", cast=int, default=65536)  # KiB
+ARGON2_PARALLELISM: int = config("ARGON2_PARALLELISM", cast=int, default=2)
+SCRYPT_ROUNDS: int = config("SCRYPT_ROUNDS", cast=int, default=16)  # log2 of N
+SCRYPT_BLOCK_SIZE: int = config("SCRYPT_BLOCK_SIZE", cast=int, default=8)
+SCRYPT_PARALLELISM: int = config("SCRYPT_PARALLELISM", cast=int, default=1)
+# seconds per hash to calibrate the cost for on startup, 0 keeps the configured cost
+PASSWORD_HASH_TARGET_TIME: float = config("PASSWORD_HASH_TARGET_TIME", cast=float, default=0)
+
+# login throttling, attempts per sliding window, 0 disables the limit
+LOGIN_THROTTLE_WINDOW: float = config("LOGIN_THROTTLE_WINDOW", cast=float, default=60)  # seconds
+LOGIN_THROTTLE_USERNAME_LIMIT: int = config("LOGIN_THROTTLE_USERNAME_LIMIT", cast=int, default=10)
+LOGIN_THROTTLE_IP_LIMIT: int = config("LOGIN_THROTTLE_IP_LIMIT", cast=int, default=100)
+LOGIN_THROTTLE_MAX_KEYS: int = config("LOGIN_THROTTLE_MAX_KEYS", cast=int, default=100000)
@@ -1,14 +1,31 @@
+import asyncio
 from typing import Callable
 
 from fastapi import FastAPI
 from loguru import logger
 
+from app.core.config import PASSWORD_HASH_TARGET_TIME, DB_REPLICA_HEALTH_CHECK_INTERVAL
+from app.db.database import replicas
 from app.db.events import close_db_connection, connect_to_db
+from app.services.cache import cache_backends
+from app.services.revocation import sync_revocations_periodically
+from app.services.security import shutdown_hashing_executor, calibrate_password_hashing, get_hashing_executor
 
 
 def create_start_app_handler(app: FastAPI) -> Callable:
     async def start_app() -> None:
         await connect_to_db(app)
+        if PASSWORD_HASH_TARGET_TIME:
+            await asyncio.get_running_loop().run_in_executor(
+                get_hashing_executor(), calibrate_password_hashing, PASSWORD_HASH_TARGET_TIME
+            )
+        app.state.revocation_sync = asyncio.create_task(sync_revocations_periodically())
+        app.state.replica_health = asyncio.create_task(
+            replicas.check_health_periodically(DB_REPLICA_HEALTH_CHECK_INTERVAL)
+        )
+        app.state.cache_listeners = [
+            asyncio.create_task(backend.listen_invalidations()) for backend in cache_backends
+        ]
 
     return start_app
 
@@ -16,6 +33,13 @@ def create_start_app_handler(app: FastAPI) -> Callable:
 def create_stop_app_handler(app: FastAPI) -> Callable:  # type: ignore
     @logger.catch
     async def stop_app() -> None:
+        app.state.revocation_sync.cancel()
+        app.state.replica_health.cancel()
+        for listener in app.state.cache_listeners:
+            listener.cancel()
+        for backend in cache_backends:
+            await backend.close()
         await close_db_connection(app)
+        shutdown_hashing_executor()
 
     return stop_app
@@ -0,0 +1,231 @@
+import bisect
+from typing import Callable, Sequence
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY: list = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], labels: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Metric):
+    """
+    Gauge set directly or read from a callback at collection time.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Callable[[], float] | None = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self._function = function
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def samples(self) -> list[str]:
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Histogram(Metric):
+    """
+    Labelled histogram, bucket counts are stored non-cumulative and summed on read.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket..., count above last bucket, sum]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        self.labels(*labels).observe(value)
+
+    def labels(self, *labels: str) -> "HistogramChild":
+        """
+        Histogram of one label combination, hot paths keep it to skip the label lookup
+        :param labels:
+        :return:
+        """
+        values = self._values.get(labels)
+        if values is None:
+            values = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        return HistogramChild(self.buckets, values)
+
+    def collect(self) -> dict[tuple, dict]:
+        result = {}
+        for labels, values in self._values.items():
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                buckets[bound] = cumulative
+            result[labels] = {"buckets": buckets, "count": cumulative, "sum": values[-1]}
+        return result
+
+    def samples(self) -> list[str]:
+        lines = []
+        for labels, data in self.collect().items():
+            for bound, count in data["buckets"].items():
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(data['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {data['count']}")
+        return lines
+
+
+class HistogramChild:
+    __slots__ = ("buckets", "values")
+
+    def __init__(self, buckets: tuple, values: list):
+        self.buckets = buckets
+        self.values = values
+
+    def observe(self, value: float) -> None:
+        values = self.values
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+
+def render_metrics() -> str:
+    """
+    Render all registered metrics in the Prometheus text exposition format
+    :return:
+    """
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+http_requests = Counter(
+    "http_requests_total",
+    "Number of handled HTTP requests",
+    labelnames=("route", "method", "status"),
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    labelnames=("route",),
+)
+# the route is only known after routing, so requests in progress are counted per process
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress",
+    "Number of HTTP requests being handled",
+)
+
+db_query_count = Histogram(
+    "db_queries_per_request",
+    "Number of SQL statements executed per request",
+    labelnames=("route",),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+db_query_time = Histogram(
+    "db_time_per_request_seconds",
+    "Total time spent in SQL statements per request",
+    labelnames=("route",),
+)
+db_slowest_query_time = Histogram(
+    "db_slowest_query_seconds",
+    "Duration of the slowest SQL statement per request",
+    labelnames=("route",),
+)
+
+password_hash_duration = Histogram(
+    "password_hash_duration_seconds",
+    "Password hashing and verification time, including the wait for a hashing worker",
+    labelnames=("operation",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+password_hash_pending = Gauge(
+    "password_hash_pending",
+    "Number of password hashing jobs queued or running",
+)
+
+token_revocation_lookups = Counter(
+    "token_revocation_lookups_total",
+    "Token revocation checks by outcome of the bloom filter and the database lookup",
+    labelnames=("result",),
+)
+
+db_pool_size = Gauge("db_pool_size", "Configured size of the database connection pool")
+db_pool_checked_out = Gauge("db_pool_checked_out", "Database connections currently in use")
+db_pool_checked_in = Gauge("db_pool_checked_in", "Idle database connections in the pool")
+db_pool_overflow = Gauge("db_pool_overflow", "Database connections opened above the pool size")
+db_pool_wait = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a database connection from the pool",
+    buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+db_pool_timeouts = Counter("db_pool_timeouts_total", "Connection checkouts that timed out waiting for the pool")
+
+login_throttled = Counter(
+    "login_throttled_total",
+    "Login attempts rejected by the throttle before the password check, by exceeded limit",
+    labelnames=("scope",),
+)
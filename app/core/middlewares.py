@@ -1,6 +1,12 @@
+import re
 import time
 from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import DEBUG
+from app.core import metrics
+from app.db.instrumentation import QueryStats, query_stats
 
 
 async def add_process_time_header(request: Request, call_next):
@@ -11,10 +17,75 @@ async def add_process_time_header(request: Request, call_next):
     return response
 
 
-class ProcessTimeMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        response.headers['X-Process-Time'] = str(process_time)
-        return response
+def get_route_name(scope: Scope) -> str:
+    route = scope.get("route")
+    return route.name if route is not None else "unmatched"
+
+
+class RouteHistograms:
+    """
+    Per-request histograms of one route.
+    """
+
+    __slots__ = ("duration", "query_count", "query_time", "slowest_query_time")
+
+    def __init__(self, route_name: str):
+        self.duration = metrics.http_request_duration.labels(route_name)
+        self.query_count = metrics.db_query_count.labels(route_name)
+        self.query_time = metrics.db_query_time.labels(route_name)
+        self.slowest_query_time = metrics.db_slowest_query_time.labels(route_name)
+
+    def observe(self, duration: float, stats: QueryStats) -> None:
+        self.duration.observe(duration)
+        self.query_count.observe(stats.count)
+        self.query_time.observe(stats.total_time)
+        self.slowest_query_time.observe(stats.slowest_time)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request count, latency, requests in progress and
+    the SQL statements executed per route, details are sent as headers in DEBUG.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._route_histograms: dict[str, RouteHistograms] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = query_stats.set(stats)
+        status_code = 500
+        start_time = time.perf_counter()
+        metrics.http_requests_in_progress.inc()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if DEBUG:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("X-Process-Time", str(time.perf_counter() - start_time))
+                    headers.append("X-DB-Query-Count", str(stats.count))
+                    headers.append("X-DB-Time", f"{stats.total_time:.6f}")
+                    if stats.slowest_statement is not None:
+                        headers.append("X-DB-Slowest-Query-Time", f"{stats.slowest_time:.6f}")
+                        headers.append("X-DB-Slowest-Query", re.sub(r"\s+", " ", stats.slowest_statement)[:200])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start_time
+            query_stats.reset(token)
+            metrics.http_requests_in_progress.dec()
+            route_name = get_route_name(scope)
+            metrics.http_requests.inc(route_name, scope["method"], str(status_code))
+            histograms = self._route_histograms.get(route_name)
+            if histograms is None:
+                histograms = self._route_histograms[route_name] = RouteHistograms(route_name)
+            histograms.observe(duration, stats)
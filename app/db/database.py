@@ -1,18 +1,73 @@
 import sqlalchemy_utils
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
+from databases import DatabaseURL
 from sqlalchemy.orm import sessionmaker
-from app.core.config import DATABASE_URL
+from app.core.config import (DATABASE_URL, MAX_CONNECTIONS_COUNT, MIN_CONNECTIONS_COUNT, DB_POOL_TIMEOUT,
+                             DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_REPLICA_CONNECTIONS)
+from app.core import metrics
+from app.db.instrumentation import instrument_engine, InstrumentedQueuePool, InstrumentedAsyncAdaptedQueuePool
+from app.db.routing import ReplicaSet, RoutingSession
 
 SQLALCHEMY_DATABASE_URL = DATABASE_URL
+ASYNC_SQLALCHEMY_DATABASE_URL = DATABASE_URL.replace(driver="asyncpg")
+
+# MIN_CONNECTIONS_COUNT connections are kept open, up to MAX_CONNECTIONS_COUNT under load
+POOL_OPTIONS = {
+    "pool_size": MIN_CONNECTIONS_COUNT,
+    "max_overflow": max(MAX_CONNECTIONS_COUNT - MIN_CONNECTIONS_COUNT, 0),
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
 
 # check_same_thread  this is only for sqlite
 engine = create_engine(
-    str(SQLALCHEMY_DATABASE_URL)
+    str(SQLALCHEMY_DATABASE_URL),
+    poolclass=InstrumentedQueuePool,
+    **POOL_OPTIONS,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# async engine used by the request handlers, runs on an asyncpg connection pool
+async_engine = create_async_engine(
+    str(ASYNC_SQLALCHEMY_DATABASE_URL),
+    poolclass=InstrumentedAsyncAdaptedQueuePool,
+    **POOL_OPTIONS,
+)
+
+# read replicas, only used for reads asking for one (see RoutingSession)
+replicas = ReplicaSet([
+    create_async_engine(
+        str(DatabaseURL(url).replace(driver="asyncpg")),
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        **POOL_OPTIONS,
+    )
+    for url in DB_REPLICA_CONNECTIONS
+])
+RoutingSession.replicas = replicas
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+for replica_engine in replicas.engines:
+    instrument_engine(replica_engine.sync_engine)
+
+metrics.db_pool_size.set_function(lambda: async_engine.pool.size())
+metrics.db_pool_checked_out.set_function(lambda: async_engine.pool.checkedout())
+metrics.db_pool_checked_in.set_function(lambda: async_engine.pool.checkedin())
+metrics.db_pool_overflow.set_function(lambda: max(async_engine.pool.overflow(), 0))
+
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 metadata = Base.metadata
 
@@ -1,25 +1,42 @@
-import asyncpg
+import asyncio
+
 from fastapi import FastAPI
 from loguru import logger
 
-from app.core.config import DATABASE_URL, MAX_CONNECTIONS_COUNT, MIN_CONNECTIONS_COUNT
+from app.core.config import DATABASE_URL, MIN_CONNECTIONS_COUNT
+from app.db.database import async_engine, replicas
 
 
 async def connect_to_db(app: FastAPI) -> None:
     logger.info(f"Connection to {DATABASE_URL}")
 
-    app.state.pool = await asyncpg.create_pool(
-        str(DATABASE_URL),
-        min_size=MIN_CONNECTIONS_COUNT,
-        max_size=MAX_CONNECTIONS_COUNT,
-    )
+    await warm_up_pool(MIN_CONNECTIONS_COUNT)
+    app.state.engine = async_engine
+    if replicas:
+        await replicas.check_health()
+        logger.info(f"Healthy replicas: {len(replicas.healthy)} of {len(replicas.engines)}")
 
     logger.info("Connection established")
 
 
+async def warm_up_pool(size: int) -> None:
+    """
+    Open ``size`` pool connections up front so first requests do not pay for connecting
+    :param size:
+    :return:
+    """
+    # the first connection initializes the dialect under a lock, it must not run concurrently
+    connections = [await async_engine.connect().start()]
+    connections += await asyncio.gather(*(async_engine.connect().start() for _ in range(size - 1)))
+    for connection in connections:
+        await connection.close()
+    logger.info(f"Connection pool warmed up: {async_engine.pool.status()}")
+
+
 async def close_db_connection(app: FastAPI) -> None:
     logger.info("Closing connection to database")
 
-    await app.state.pool.close()
+    await app.state.engine.dispose()
+    await replicas.dispose()
 
     logger.info("Connection closed")
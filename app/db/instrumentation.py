@@ -0,0 +1,77 @@
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+from app.core import metrics
+
+
+class QueryStats:
+    """
+    SQL statements executed while handling one request.
+    """
+
+    __slots__ = ("count", "total_time", "slowest_time", "slowest_statement")
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: str | None = None
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+
+query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = query_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - context._query_start_time)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Record every statement of the engine into the QueryStats of the current request,
+    for async engines pass ``async_engine.sync_engine``
+    :param engine:
+    :return:
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class PoolWaitMixin:
+    """
+    Record how long checkouts wait for a connection and how many of them time out.
+    """
+
+    def _do_get(self):
+        start_time = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.db_pool_timeouts.inc()
+            raise
+        finally:
+            metrics.db_pool_wait.observe(time.perf_counter() - start_time)
+
+
+class InstrumentedQueuePool(PoolWaitMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(PoolWaitMixin, AsyncAdaptedQueuePool):
+    pass
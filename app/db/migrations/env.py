@@ -5,6 +5,7 @@ from sqlalchemy import pool
 from app.db.database import Base, render_item
 from app.core.config import DATABASE_URL
 from app.db.models.users import *
+from app.db.models.tokens import *
 from alembic import context
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,44 @@
+"""add missing user indexes
+
+Revision ID: 1b72f2c7a326
+Revises: ff16dd99f7df
+Create Date: 2026-10-18 17:31:24.236679
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b72f2c7a326'
+down_revision: Union[str, None] = 'ff16dd99f7df'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # built CONCURRENTLY so the tables stay writable, this can not run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_user_roles_user_id'), 'user_roles', ['user_id'], unique=False, postgresql_concurrently=True
+        )
+        op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=False, postgresql_concurrently=True)
+        op.create_index(
+            'ix_users_active_id', 'users', ['id'], unique=False,
+            postgresql_where=sa.text('is_active'), postgresql_concurrently=True
+        )
+        # fails on usernames differing only in case, those have to be renamed first
+        op.create_index(
+            'ix_users_username_lower', 'users', [sa.text('lower(username)')], unique=True,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_username_lower', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_users_active_id', table_name='users', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_users_email'), table_name='users', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_user_roles_user_id'), table_name='user_roles', postgresql_concurrently=True)
@@ -0,0 +1,37 @@
+"""drop redundant indexes
+
+Revision ID: 282e66742057
+Revises: 1b72f2c7a326
+Create Date: 2026-10-18 17:31:35.812253
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '282e66742057'
+down_revision: Union[str, None] = '1b72f2c7a326'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # primary keys are indexed already, ix_users_username_lower replaces the case-sensitive unique constraint
+    op.drop_constraint('users_username_key', 'users', type_='unique')
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_refresh_tokens_id', table_name='refresh_tokens', postgresql_concurrently=True)
+        op.drop_index('ix_revoked_tokens_id', table_name='revoked_tokens', postgresql_concurrently=True)
+        op.drop_index('ix_user_roles_id', table_name='user_roles', postgresql_concurrently=True)
+        op.drop_index('ix_users_id', table_name='users', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_id', 'users', ['id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_user_roles_id', 'user_roles', ['id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_revoked_tokens_id', 'revoked_tokens', ['id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_refresh_tokens_id', 'refresh_tokens', ['id'], unique=False, postgresql_concurrently=True)
+    op.create_unique_constraint('users_username_key', 'users', ['username'])
@@ -10,7 +10,6 @@ class BaseModel(Base):
         nullable=False,
         primary_key=True,
         autoincrement=True,
-        index=True
     )
     created_at = Column(
         DateTime(timezone=True),
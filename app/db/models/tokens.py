@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, ForeignKey, BigInteger, DateTime
+
+from app.db.models.base import BaseModel
+
+
+class RefreshToken(BaseModel):
+    __tablename__ = "refresh_tokens"
+
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # only the sha256 of the token is stored
+    token_hash = Column(String(64), nullable=False, unique=True, index=True)
+    # all tokens issued by rotating one login share the family, reuse of a rotated token revokes the family
+    family_id = Column(String(32), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class RevokedToken(BaseModel):
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), nullable=False, unique=True, index=True)
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    # rows are only needed until the token would have expired anyway
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, ForeignKey, BigInteger, UniqueConstraint
+from sqlalchemy import Column, String, Boolean, ForeignKey, BigInteger, UniqueConstraint, Index, func, text
 from sqlalchemy.orm import relationship
 # from sqlalchemy_utils import ChoiceType
 from sqlalchemy_utils.types.choice import ChoiceType
@@ -15,8 +15,8 @@ class UserRole(BaseModel):
     # name = Column(ChoiceType(UserRoleChoices, impl=String()), unique=True, default=UserRoleChoices.VIEWER)
     description = Column(String(250), nullable=True)
 
-    user_id = Column(BigInteger, ForeignKey("users.id"))
-    users = relationship("User", back_populates="role")
+    user_id = Column(BigInteger, ForeignKey("users.id"), index=True)
+    users = relationship("User", back_populates="role", lazy="raise")
 
     __table_args__ = (
         UniqueConstraint('name', 'user_id'),
@@ -26,11 +26,19 @@ class UserRole(BaseModel):
 class User(BaseModel):
     __tablename__ = "users"
 
-    username = Column(String(250), unique=True)
+    username = Column(String(250))
     first_name = Column(String(250), nullable=True)
     last_name = Column(String(250), nullable=True)
-    email = Column(String, nullable=True)
+    email = Column(String, nullable=True, index=True)
     password = Column(String)
     is_active = Column(Boolean, default=True)
 
-    role = relationship("UserRole", back_populates="users")
+    # must be loaded explicitly (selectinload / joinedload), implicit per-row loads would be N+1 queries
+    role = relationship("UserRole", back_populates="users", lazy="raise")
+
+    __table_args__ = (
+        # usernames are unique regardless of case, lookups go through lower(username)
+        Index("ix_users_username_lower", func.lower(username), unique=True),
+        # listing and authenticating only ever need active users
+        Index("ix_users_active_id", "id", postgresql_where=text("is_active")),
+    )
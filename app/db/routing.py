@@ -0,0 +1,89 @@
+import asyncio
+import itertools
+
+from loguru import logger
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+# session.info key, set once the session wrote something or reads for a write
+PIN_PRIMARY = "pin_primary"
+# session.info key, the replica serving all replica reads of the session
+REPLICA_ENGINE = "replica_engine"
+# session.info key, whether the last statement ran on a replica
+ON_REPLICA = "on_replica"
+
+
+class ReplicaSet:
+    """
+    Read replicas handed out round-robin, replicas failing the health check are skipped
+    until they pass it again
+    """
+
+    def __init__(self, engines: list[AsyncEngine]):
+        self.engines = engines
+        self.healthy = list(engines)
+        self._counter = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def choose(self) -> AsyncEngine | None:
+        healthy = self.healthy
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    @staticmethod
+    async def is_healthy(engine: AsyncEngine, timeout: float) -> bool:
+        try:
+            async with engine.connect() as connection:
+                await asyncio.wait_for(connection.execute(text("SELECT 1")), timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"Replica {engine.url!r} failed health check: {e!r}")
+            return False
+
+    async def check_health(self, timeout: float = 2) -> None:
+        results = await asyncio.gather(*(self.is_healthy(engine, timeout) for engine in self.engines))
+        self.healthy = [engine for engine, is_healthy in zip(self.engines, results) if is_healthy]
+
+    async def check_health_periodically(self, interval: float) -> None:
+        if not self.engines:
+            return
+        while True:
+            await asyncio.sleep(interval)
+            await self.check_health()
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+
+class RoutingSession(Session):
+    """
+    Session sending reads marked with ``bind_arguments={"replica": True}`` to a replica, the same one
+    for the whole session so related rows (e.g. roles loaded with selectinload) come from one snapshot.
+    Everything else, and every read after the session wrote or was pinned, goes to the primary
+    """
+    replicas: ReplicaSet
+
+    def get_bind(self, mapper=None, clause=None, replica: bool = False, **kw):
+        if self._flushing or getattr(clause, "is_dml", False):
+            self.info[PIN_PRIMARY] = True
+        elif replica and not self.info.get(PIN_PRIMARY):
+            engine = self.info.get(REPLICA_ENGINE) or self.replicas.choose()
+            if engine is not None:
+                self.info[REPLICA_ENGINE] = engine
+                self.info[ON_REPLICA] = True
+                return engine.sync_engine
+        self.info[ON_REPLICA] = False
+        return super().get_bind(mapper, clause, **kw)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def route_relationship_loads(orm_execute_state) -> None:
+    # eager loads (e.g. selectinload) run right after the statement they load for and follow it,
+    # to the replica when it read from one, to the primary otherwise
+    if orm_execute_state.is_relationship_load and orm_execute_state.session.info.get(ON_REPLICA):
+        orm_execute_state.bind_arguments["replica"] = True
@@ -1,17 +1,22 @@
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
 from starlette.exceptions import HTTPException
 from starlette.middleware.cors import CORSMiddleware
 
 from app.core.config import PROJECT_NAME, DEBUG, VERSION, ALLOWED_HOSTS
 from app.core.events import create_start_app_handler, create_stop_app_handler
-from app.core.middlewares import ProcessTimeMiddleware
+from app.core.middlewares import MetricsMiddleware
 from app.api.api import router as api_router
+from app.api.routers.metrics import router as metrics_router
+from app.api.routers.well_known import router as well_known_router
 from app.core.config import API_PREFIX
 
 
 def get_application() -> FastAPI:
-    application = FastAPI(title=PROJECT_NAME, debug=DEBUG, version=VERSION)
+    application = FastAPI(
+        title=PROJECT_NAME, debug=DEBUG, version=VERSION, default_response_class=ORJSONResponse
+    )
 
     application.add_middleware(
         CORSMiddleware,
@@ -20,12 +25,14 @@ def get_application() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
-    # application.add_middleware(ProcessTimeMiddleware)
+    application.add_middleware(MetricsMiddleware)
 
-    # application.add_event_handler("startup", create_start_app_handler(application))
-    # application.add_event_handler("shutdown", create_stop_app_handler(application))
+    application.add_event_handler("startup", create_start_app_handler(application))
+    application.add_event_handler("shutdown", create_stop_app_handler(application))
 
     application.include_router(api_router, prefix=API_PREFIX)
+    application.include_router(metrics_router)
+    application.include_router(well_known_router)
 
     return application
 
@@ -1,7 +1,8 @@
 from app.db.domain.base import DateTimeMixin, IdMixin
 from app.schemas.base import RWSchema
-from pydantic import EmailStr
+from pydantic import EmailStr, TypeAdapter
 from app.db.domain.users import User, Role
+from app.utils.choices import BatchItemStatusChoices
 
 
 class UserInCreate(RWSchema):
@@ -38,19 +39,82 @@ class UserInUpdate(RWSchema):
 class UserResponse(User, DateTimeMixin, IdMixin):
     role: list[Role] | None = None
 
+    @classmethod
+    def from_row(cls, user) -> "UserResponse":
+        """
+        Build from a user loaded with its roles without validation, the row already passed it
+        when it was written. Validating EmailStr dominates serialization of user lists
+        :param user: User model instance
+        :return:
+        """
+        return cls.model_construct(
+            id=user.id,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+            username=user.username,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            email=user.email,
+            is_active=user.is_active,
+            role=[Role.model_construct(name=role.name, description=role.description) for role in user.role],
+        )
+
 
 class UserList(RWSchema):
     users: list[User]
 
 
+class UserBatchItem(RWSchema):
+    username: str
+    id: int | None = None
+    status: BatchItemStatusChoices
+
+
+class UserBatchResult(RWSchema):
+    created: int
+    conflicts: int
+    results: list[UserBatchItem]
+
+
+class UserPage(RWSchema):
+    users: list[UserResponse]
+    next_cursor: str | None = None
+
+
+# serializers of the user endpoints, built once instead of per response
+user_response_adapter = TypeAdapter(UserResponse)
+user_list_adapter = TypeAdapter(list[UserResponse])
+user_page_adapter = TypeAdapter(UserPage)
+
+
 class TokenData(RWSchema):
     id: int
     username: str
+    jti: str | None = None
+    exp: int | None = None
 
 
 class Token(RWSchema):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+
+class RefreshTokenIn(RWSchema):
+    refresh_token: str
+
+
+class IntrospectBatchIn(RWSchema):
+    tokens: list[str]
+
+
+class TokenIntrospection(RWSchema):
+    active: bool
+    claims: TokenData | None = None
+
+
+class IntrospectBatchOut(RWSchema):
+    results: list[TokenIntrospection]
 
 
 class ChangePasswordIn(RWSchema):
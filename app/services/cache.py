@@ -0,0 +1,33 @@
+from app.core.config import (CACHE_BACKEND, CACHE_SHM_DIR, CACHE_REDIS_URL, CACHE_REDIS_POOL_SIZE, CACHE_NEAR_CACHE_SIZE,
+                             CACHE_NEAR_CACHE_TTL)
+from app.utils.cache_backends import CacheBackend, MemoryCacheBackend, SharedMemoryCacheBackend, RedisCacheBackend
+from app.utils.choices import CacheBackendChoices
+
+# every backend created by the service, started and closed together with the application
+cache_backends: list[CacheBackend] = []
+
+
+def create_cache_backend(name: str, maxsize: int, ttl: float, slot_size: int = 1024) -> CacheBackend:
+    """
+    Create cache of the configured backend type
+    :param name: namespace of the cache, used as file name and key prefix
+    :param maxsize: entries kept in memory and shared memory caches
+    :param ttl: upper bound for entry lifetime of memory caches
+    :param slot_size: bytes per entry of shared memory caches
+    :return:
+    """
+    backend_type = CacheBackendChoices(CACHE_BACKEND)
+    if backend_type == CacheBackendChoices.SHM:
+        backend = SharedMemoryCacheBackend(CACHE_SHM_DIR, name, slots=maxsize, slot_size=slot_size)
+    elif backend_type == CacheBackendChoices.REDIS:
+        backend = RedisCacheBackend(
+            CACHE_REDIS_URL,
+            prefix=f"auth:{name}:",
+            near_cache_size=CACHE_NEAR_CACHE_SIZE,
+            near_cache_ttl=CACHE_NEAR_CACHE_TTL,
+            pool_size=CACHE_REDIS_POOL_SIZE,
+        )
+    else:
+        backend = MemoryCacheBackend(maxsize=maxsize, ttl=ttl)
+    cache_backends.append(backend)
+    return backend
@@ -0,0 +1,157 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from loguru import logger
+from sqlalchemy import delete, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core import metrics
+from app.core.config import (REVOCATION_FILTER_CAPACITY, REVOCATION_FILTER_ERROR_RATE, REVOCATION_SYNC_INTERVAL,
+                             REVOCATION_SYNC_GAP_TIMEOUT, REVOCATION_PURGE_INTERVAL)
+from app.db.database import AsyncSessionLocal
+from app.db.models.tokens import RevokedToken
+from app.services.base import BaseService
+from app.utils.bloom import BloomFilter
+
+# every revoked jti of this and the other workers, refreshed incrementally from revoked_tokens
+revocation_filter = BloomFilter(capacity=REVOCATION_FILTER_CAPACITY, error_rate=REVOCATION_FILTER_ERROR_RATE)
+_last_synced_id = 0
+# ids below _last_synced_id not synced yet -> monotonic deadline, ids are taken in insert order
+# but committed in any order, so a skipped id may still show up until its deadline
+_missing_ids: dict[int, float] = {}
+MAX_TRACKED_GAP = 1000
+
+
+class RevocationService(BaseService):
+
+    async def revoke(self, jti: str, user_id: int | None, expires_at: datetime) -> None:
+        await self.db.execute(
+            pg_insert(RevokedToken)
+            .values(jti=jti, user_id=user_id, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+        )
+        await self.db.commit()
+        revocation_filter.add(jti)
+
+    async def is_revoked(self, jti: str) -> bool:
+        """
+        Check revocation, only a database lookup when the filter reports a possible match
+        :param jti:
+        :return:
+        """
+        if jti not in revocation_filter:
+            metrics.token_revocation_lookups.inc("negative")
+            return False
+        result = await self.db.execute(select(RevokedToken.id).where(RevokedToken.jti == jti))
+        revoked = result.first() is not None
+        metrics.token_revocation_lookups.inc("revoked" if revoked else "false_positive")
+        return revoked
+
+    async def revoked_jtis(self, jtis: list[str]) -> set[str]:
+        """
+        Batch revocation check, one query for the jtis the filter reports as possible matches
+        :param jtis:
+        :return: revoked jtis
+        """
+        candidates = {jti for jti in jtis if jti in revocation_filter}
+        metrics.token_revocation_lookups.inc("negative", amount=len(set(jtis)) - len(candidates))
+        if not candidates:
+            return set()
+        result = await self.db.execute(select(RevokedToken.jti).where(RevokedToken.jti.in_(candidates)))
+        revoked = set(result.scalars().all())
+        metrics.token_revocation_lookups.inc("revoked", amount=len(revoked))
+        metrics.token_revocation_lookups.inc("false_positive", amount=len(candidates) - len(revoked))
+        return revoked
+
+    async def sync_filter(self) -> int:
+        """
+        Add jtis revoked since the last sync and the ones of skipped ids committed since,
+        a full filter is rebuilt first
+        :return: number of synced rows
+        """
+        if revocation_filter.count >= revocation_filter.capacity:
+            await self.rebuild_filter()
+        now = time.monotonic()
+        for row_id, deadline in list(_missing_ids.items()):
+            if deadline < now:
+                del _missing_ids[row_id]
+        condition = RevokedToken.id > _last_synced_id
+        if _missing_ids:
+            condition = or_(condition, RevokedToken.id.in_(list(_missing_ids)))
+        result = await self.db.execute(
+            select(RevokedToken.id, RevokedToken.jti).where(condition).order_by(RevokedToken.id)
+        )
+        rows = result.all()
+        for row in rows:
+            # jtis revoked by this worker are in the filter already and are not counted again
+            revocation_filter.add(row.jti)
+        track_synced_ids([row.id for row in rows])
+        return len(rows)
+
+    async def rebuild_filter(self) -> None:
+        """
+        Replace the filter with one holding the unexpired jtis only, the old filter keeps
+        answering until the new one is complete and stays in place when the query fails
+        :return:
+        """
+        global revocation_filter
+        result = await self.db.execute(
+            select(RevokedToken.id, RevokedToken.jti)
+            .where(RevokedToken.expires_at > datetime.now(timezone.utc))
+            .order_by(RevokedToken.id)
+        )
+        rows = result.all()
+        rebuilt = BloomFilter(capacity=revocation_filter.capacity, error_rate=revocation_filter.error_rate)
+        for row in rows:
+            rebuilt.add(row.jti)
+        revocation_filter = rebuilt
+        track_synced_ids([row.id for row in rows])
+        logger.info(f"Revocation filter rebuilt with {rebuilt.count} unexpired jtis")
+
+    async def purge_expired(self) -> int:
+        """
+        Delete revocations of tokens that have expired anyway
+        :return: number of deleted rows
+        """
+        result = await self.db.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now(timezone.utc))
+        )
+        await self.db.commit()
+        return result.rowcount
+
+
+def track_synced_ids(ids: list[int]) -> None:
+    """
+    Move the sync position past the ids and remember the ids skipped on the way
+    :param ids: synced ids in ascending order
+    :return:
+    """
+    global _last_synced_id
+    deadline = time.monotonic() + REVOCATION_SYNC_GAP_TIMEOUT
+    for row_id in ids:
+        if row_id > _last_synced_id:
+            # the first sync starts behind purged rows, wider gaps are sequence jumps rather than open inserts
+            if _last_synced_id and row_id - _last_synced_id <= MAX_TRACKED_GAP:
+                for missing_id in range(_last_synced_id + 1, row_id):
+                    _missing_ids[missing_id] = deadline
+            _last_synced_id = row_id
+        else:
+            _missing_ids.pop(row_id, None)
+
+
+async def sync_revocations_periodically(interval: float = REVOCATION_SYNC_INTERVAL,
+                                        purge_interval: float = REVOCATION_PURGE_INTERVAL) -> None:
+    next_purge = time.monotonic() + purge_interval
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                service = RevocationService(db)
+                await service.sync_filter()
+                if time.monotonic() >= next_purge:
+                    next_purge = time.monotonic() + purge_interval
+                    purged = await service.purge_expired()
+                    logger.info(f"Purged {purged} expired revocations")
+        except Exception:
+            logger.exception("Revocation filter sync failed")
+        await asyncio.sleep(interval)
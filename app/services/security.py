@@ -1,13 +1,51 @@
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
+import asyncio
+import hashlib
+import json
+import math
+import secrets
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+from pathlib import Path
 
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+
+from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from loguru import logger
 from passlib.context import CryptContext
-from app.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.config import (SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, PASSWORD_HASH_WORKERS,
+                             PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_BATCH_WORKERS, JWT_KEYS_DIR, JWT_ACTIVE_KID,
+                             PASSWORD_HASH_SCHEMES,
+                             BCRYPT_ROUNDS, ARGON2_ROUNDS, ARGON2_MEMORY_COST, ARGON2_PARALLELISM, SCRYPT_ROUNDS,
+                             SCRYPT_BLOCK_SIZE, SCRYPT_PARALLELISM)
+from app.core import metrics
+from app.services.token_codec import HMACTokenCodec
+from app.utils import constants as const
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min_rounds equal to rounds marks hashes made with a lower cost as outdated
+pwd_context = CryptContext(
+    schemes=PASSWORD_HASH_SCHEMES,
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    argon2__rounds=ARGON2_ROUNDS,
+    argon2__min_rounds=ARGON2_ROUNDS,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+    scrypt__rounds=SCRYPT_ROUNDS,
+    scrypt__min_rounds=SCRYPT_ROUNDS,
+    scrypt__block_size=SCRYPT_BLOCK_SIZE,
+    scrypt__parallelism=SCRYPT_PARALLELISM,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
 
+_hashing_executor: ThreadPoolExecutor | None = None
+_pending_hashes = 0
+
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(str(SECRET_KEY) + password)
@@ -17,12 +55,209 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(str(SECRET_KEY) + plain_password, hashed_password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
+
+
+def measure_hash_time(scheme: str, rounds: int, samples: int = 3) -> float:
+    """
+    Fastest of a few hashes with given scheme and cost
+    :param scheme:
+    :param rounds:
+    :param samples:
+    :return: seconds per hash
+    """
+    handler = pwd_context.handler(scheme).using(rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        start_time = time.perf_counter()
+        handler.hash(str(SECRET_KEY) + "calibration")
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+def calibrate_password_hashing(target_time: float) -> int:
+    """
+    Raise the cost of the default scheme until a hash takes about ``target_time`` on this machine,
+    the configured cost is kept as the lower bound
+    :param target_time: seconds
+    :return: rounds in use
+    """
+    scheme = pwd_context.default_scheme()
+    handler = pwd_context.handler(scheme)
+    rounds = handler.default_rounds
+    elapsed = measure_hash_time(scheme, rounds)
+    if handler.rounds_cost == "log2":
+        calibrated = rounds + math.floor(math.log2(target_time / elapsed))
+    else:
+        calibrated = math.floor(rounds * target_time / elapsed)
+    calibrated = min(max(calibrated, rounds), handler.max_rounds)
+    if calibrated != rounds:
+        pwd_context.update(**{f"{scheme}__rounds": calibrated, f"{scheme}__min_rounds": calibrated})
+        elapsed = measure_hash_time(scheme, calibrated, samples=1)
+    logger.info(f"Password hashing: {scheme} rounds={calibrated}, {1 / elapsed:.1f} hashes/s per worker")
+    return calibrated
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, str(SECRET_KEY), algorithm=ALGORITHM)
+    if expires_delta is None:
+        expires_delta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": int(time.time() + expires_delta.total_seconds()), "jti": uuid.uuid4().hex})
+    if is_symmetric_algorithm():
+        return get_token_codec().encode(to_encode)
+    kid = get_active_kid()
+    encoded_jwt = jwt.encode(to_encode, get_signing_keys()[kid], algorithm=ALGORITHM, headers={"kid": kid})
     return encoded_jwt
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Verify token signature and expiry, asymmetric tokens are verified with the key named by their ``kid``
+    :param token:
+    :return: claims
+    :raises JWTError:
+    """
+    if is_symmetric_algorithm():
+        return get_token_codec().decode(token)
+    key = get_verification_keys().get(jwt.get_unverified_header(token).get("kid"))
+    if key is None:
+        raise JWTError("Unknown key id")
+    return jwt.decode(token, key, algorithms=[ALGORITHM])
+
+
+def is_symmetric_algorithm() -> bool:
+    return ALGORITHM.startswith("HS")
+
+
+@lru_cache
+def get_token_codec() -> HMACTokenCodec:
+    return HMACTokenCodec(str(SECRET_KEY), ALGORITHM)
+
+
+@lru_cache
+def get_signing_keys() -> dict[str, Key]:
+    """
+    Load private keys from JWT_KEYS_DIR, the file name without ``.pem`` is the key id
+    :return: private keys by kid
+    """
+    keys = {
+        path.stem: jwk.construct(path.read_text(), ALGORITHM)
+        for path in sorted(Path(JWT_KEYS_DIR).glob("*.pem"))
+    }
+    if not keys:
+        raise RuntimeError(f"No signing keys for {ALGORITHM} found in {JWT_KEYS_DIR}")
+    return keys
+
+
+@lru_cache
+def get_verification_keys() -> dict[str, Key]:
+    return {kid: key.public_key() for kid, key in get_signing_keys().items()}
+
+
+def get_active_kid() -> str:
+    return JWT_ACTIVE_KID or list(get_signing_keys())[-1]
+
+
+@lru_cache
+def get_jwks() -> tuple[bytes, str]:
+    """
+    Public keys as JWK set, rendered once
+    :return: JSON document and its ETag
+    """
+    keys = []
+    if not is_symmetric_algorithm():
+        keys = [
+            {**key.to_dict(), "kid": kid, "use": "sig", "alg": ALGORITHM}
+            for kid, key in get_verification_keys().items()
+        ]
+    document = json.dumps({"keys": keys}, sort_keys=True).encode()
+    return document, f'"{hashlib.sha256(document).hexdigest()[:32]}"'
+
+
+def generate_refresh_token() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    # refresh tokens are random, a fast hash is enough to keep them unusable from a database dump
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def run_in_hashing_executor(func, *args):
+    """
+    Run hashing function in the hashing executor, reject with 503 when too many hashes are pending
+    :param func:
+    :param args:
+    :return:
+    """
+    global _pending_hashes
+    if _pending_hashes >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=const.SERVICE_BUSY,
+            headers={"Retry-After": "1"},
+        )
+    _pending_hashes += 1
+    start_time = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_hashing_executor(), func, *args)
+    finally:
+        _pending_hashes -= 1
+        metrics.password_hash_duration.observe(time.perf_counter() - start_time, func.__name__)
+
+
+metrics.password_hash_pending.set_function(lambda: _pending_hashes)
+
+
+async def aget_password_hash(password: str) -> str:
+    return await run_in_hashing_executor(get_password_hash, password)
+
+
+async def aget_password_hashes(passwords: list[str]) -> list[str]:
+    """
+    Hash many passwords, at most PASSWORD_HASH_BATCH_WORKERS at a time. Every password is a job
+    of its own counted in the pending hashes, so logins queue behind a few of them, not the whole batch
+    :param passwords:
+    :return: hashes in the same order
+    """
+    hashes = [""] * len(passwords)
+    indexes = iter(range(len(passwords)))
+
+    async def hash_next():
+        for index in indexes:
+            hashes[index] = await aget_password_hash(passwords[index])
+
+    tasks = [asyncio.ensure_future(hash_next()) for _ in range(min(PASSWORD_HASH_BATCH_WORKERS, len(passwords)))]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return hashes
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    return await run_in_hashing_executor(verify_password, plain_password, hashed_password)
+
+
+async def adummy_verify() -> bool:
+    # as slow as verifying a real password with the default scheme, hides whether the user exists
+    return await run_in_hashing_executor(pwd_context.dummy_verify)
+
+
+def get_hashing_executor() -> ThreadPoolExecutor:
+    # bcrypt releases the GIL, so a thread pool keeps hashing off the event loop
+    global _hashing_executor
+    if _hashing_executor is None:
+        _hashing_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+    return _hashing_executor
+
+
+def shutdown_hashing_executor() -> None:
+    global _hashing_executor
+    if _hashing_executor is not None:
+        _hashing_executor.shutdown(wait=False, cancel_futures=True)
+        _hashing_executor = None
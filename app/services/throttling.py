@@ -0,0 +1,61 @@
+import math
+
+from fastapi import HTTPException, status
+
+from app.core import metrics
+from app.core.config import (LOGIN_THROTTLE_WINDOW, LOGIN_THROTTLE_USERNAME_LIMIT, LOGIN_THROTTLE_IP_LIMIT,
+                             LOGIN_THROTTLE_MAX_KEYS)
+from app.utils import constants as const
+from app.utils.rate_limit import RateLimitBackend, MemoryRateLimitBackend
+
+
+class LoginThrottle:
+    """
+    Sliding window limits on login attempts per username and per client address,
+    checked before the user is loaded and the password verified
+    """
+
+    def __init__(self, backend: RateLimitBackend, window: float, username_limit: int, ip_limit: int):
+        self.backend = backend
+        self.window = window
+        self.username_limit = username_limit
+        self.ip_limit = ip_limit
+
+    @staticmethod
+    def username_key(username: str) -> str:
+        return f"login:username:{username.lower()}"
+
+    async def check(self, username: str, client_ip: str | None) -> None:
+        """
+        Count login attempt, raise 429 when the username or the client address is over its limit
+        :param username:
+        :param client_ip:
+        :return:
+        """
+        exceeded = []
+        if self.username_limit:
+            if await self.backend.hit(self.username_key(username), self.window) > self.username_limit:
+                exceeded.append("username")
+        if self.ip_limit and client_ip:
+            if await self.backend.hit(f"login:ip:{client_ip}", self.window) > self.ip_limit:
+                exceeded.append("ip")
+        if exceeded:
+            for scope in exceeded:
+                metrics.login_throttled.inc(scope)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=const.TOO_MANY_LOGIN_ATTEMPTS,
+                headers={"Retry-After": str(math.ceil(self.window))},
+            )
+
+    async def reset(self, username: str) -> None:
+        # the address limit is kept, a valid login must not unlock guessing other accounts
+        await self.backend.reset(self.username_key(username))
+
+
+login_throttle = LoginThrottle(
+    backend=MemoryRateLimitBackend(max_keys=LOGIN_THROTTLE_MAX_KEYS),
+    window=LOGIN_THROTTLE_WINDOW,
+    username_limit=LOGIN_THROTTLE_USERNAME_LIMIT,
+    ip_limit=LOGIN_THROTTLE_IP_LIMIT,
+)
@@ -0,0 +1,74 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+from jose import JWTError
+from jose.exceptions import ExpiredSignatureError
+
+HMAC_DIGESTS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+
+def b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+class HMACTokenCodec:
+    """
+    JWT encoder/decoder for HMAC algorithms. Key and header segment are prepared once,
+    tokens issued by python-jose with the same key and algorithm are accepted as well
+    """
+
+    def __init__(self, secret: str, algorithm: str = "HS256"):
+        if algorithm not in HMAC_DIGESTS:
+            raise ValueError(f"Unsupported algorithm {algorithm}")
+        self.algorithm = algorithm
+        self._digest = HMAC_DIGESTS[algorithm]
+        self._key = secret.encode()
+        header = json.dumps({"alg": algorithm, "typ": "JWT"}, separators=(",", ":"), sort_keys=True)
+        self._header = b64encode(header.encode())
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        return hmac.new(self._key, signing_input, self._digest).digest()
+
+    def encode(self, claims: dict) -> str:
+        payload = b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        signing_input = self._header + b"." + payload
+        return (signing_input + b"." + b64encode(self._sign(signing_input))).decode()
+
+    def decode(self, token: str) -> dict:
+        """
+        Verify signature and expiry
+        :param token:
+        :return: claims
+        :raises JWTError:
+        """
+        try:
+            signing_input, signature = token.encode().rsplit(b".", 1)
+            header, payload = signing_input.split(b".")
+            if header != self._header and json.loads(b64decode(header)).get("alg") != self.algorithm:
+                raise JWTError("The specified alg value is not allowed")
+            if not hmac.compare_digest(self._sign(signing_input), b64decode(signature)):
+                raise JWTError("Signature verification failed.")
+            claims = json.loads(b64decode(payload))
+        except (ValueError, TypeError, AttributeError) as e:
+            raise JWTError("Invalid token") from e
+        if not isinstance(claims, dict):
+            raise JWTError("Invalid payload")
+        exp = claims.get("exp")
+        if exp is not None:
+            if not isinstance(exp, int):
+                raise JWTError("Invalid claims")
+            if exp < time.time():
+                raise ExpiredSignatureError("Signature has expired.")
+        return claims
+
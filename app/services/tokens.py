@@ -0,0 +1,78 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+
+from app.core.config import REFRESH_TOKEN_EXPIRE_DAYS
+from app.db.models.tokens import RefreshToken
+from app.services import security
+from app.services.base import BaseService
+
+
+class TokensService(BaseService):
+
+    async def create_refresh_token(self, user_id: int, family_id: str | None = None) -> str:
+        """
+        Issue new refresh token, a new family is started unless given
+        :param user_id:
+        :param family_id:
+        :return: plain refresh token, it is not stored
+        """
+        token = security.generate_refresh_token()
+        self.db.add(RefreshToken(
+            user_id=user_id,
+            token_hash=security.hash_refresh_token(token),
+            family_id=family_id or uuid.uuid4().hex,
+            expires_at=datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        ))
+        await self.db.commit()
+        return token
+
+    async def rotate_refresh_token(self, token: str) -> tuple[int, str] | None:
+        """
+        Consume refresh token and issue its successor in the same family,
+        presenting an already consumed token revokes the whole family
+        :param token:
+        :return: user id and new refresh token, None if token is not valid
+        """
+        token_hash = security.hash_refresh_token(token)
+        now = datetime.now(timezone.utc)
+        result = await self.db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at > now,
+            )
+            .values(revoked_at=now)
+            .returning(RefreshToken.user_id, RefreshToken.family_id)
+            .execution_options(synchronize_session=False)
+        )
+        consumed = result.first()
+        if consumed is None:
+            result = await self.db.execute(
+                select(RefreshToken.family_id, RefreshToken.revoked_at).where(RefreshToken.token_hash == token_hash)
+            )
+            known = result.first()
+            if known is not None and known.revoked_at is not None:
+                await self.revoke_family(known.family_id)
+            return None
+        return consumed.user_id, await self.create_refresh_token(consumed.user_id, consumed.family_id)
+
+    async def revoke_family(self, family_id: str) -> None:
+        await self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+
+    async def revoke_user_tokens(self, user_id: int) -> None:
+        await self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
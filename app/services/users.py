@@ -1,68 +1,406 @@
-from datetime import timedelta
-from typing import Annotated
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Iterable
 
 from fastapi import Depends, HTTPException
-from jose import jwt, JWTError
+from jose import JWTError
+from loguru import logger
 from starlette import status
 
-from app.api.dependencies.db import get_service
-from app.core.config import SECRET_KEY, ALGORITHM, JWT_TOKEN_PREFIX
-from sqlalchemy.orm import Session
+from app.api.dependencies.db import get_service, get_db
+from app.core.config import (JWT_TOKEN_PREFIX, CLAIMS_CACHE_MAX_SIZE, CLAIMS_CACHE_TTL,
+                             USER_CACHE_MAX_SIZE, USER_CACHE_TTL, UNKNOWN_USERNAME_CACHE_MAX_SIZE,
+                             UNKNOWN_USERNAME_CACHE_TTL, DB_REPLICA_PIN_SECONDS)
+from sqlalchemy import select, update, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import selectinload, joinedload, aliased, contains_eager
+from sqlalchemy.orm.attributes import set_committed_value
+from app.db.database import AsyncSessionLocal, replicas
+from app.db.routing import PIN_PRIMARY
 from app.db.domain.users import UserInDB, Role
 from app.db.models.users import User, UserRole
-from app.schemas.users import UserInCreate, UserUpdate, TokenData, ChangePasswordIn, ChangePasswordOut, Token
+from app.schemas.users import (UserInCreate, UserUpdate, TokenData, ChangePasswordIn, ChangePasswordOut, Token,
+                               UserResponse, user_response_adapter)
 from app.services import security
 from app.services.base import BaseService
-from app.services.security import get_password_hash, oauth2_scheme
+from app.services.cache import create_cache_backend
+from app.services.revocation import RevocationService
+from app.services.tokens import TokensService
+from app.services.security import aget_password_hash, oauth2_scheme
 from app.utils import constants as const
-from app.utils.choices import UserRoleChoices
+from app.utils.cache import TTLCache
+from app.utils.choices import UserRoleChoices, BatchItemStatusChoices
+
+# verified token claims by token, expire together with the token
+claims_cache = TTLCache(maxsize=CLAIMS_CACHE_MAX_SIZE, ttl=CLAIMS_CACHE_TTL)
+# user snapshots by user id and role checks by "role:<user id>", invalidated on every write to the user
+user_cache = create_cache_backend("users", maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL)
+# usernames recently not found on login, invalidated when a user takes the username
+unknown_usernames = create_cache_backend(
+    "unknown-usernames", maxsize=UNKNOWN_USERNAME_CACHE_MAX_SIZE, ttl=UNKNOWN_USERNAME_CACHE_TTL, slot_size=128
+)
+# users written in the last DB_REPLICA_PIN_SECONDS by "id:<user id>" and "username:<username>"
+recent_writes = create_cache_backend(
+    "recent-writes", maxsize=USER_CACHE_MAX_SIZE, ttl=DB_REPLICA_PIN_SECONDS, slot_size=128
+)
+# running rehash tasks, referenced until done so they are not garbage collected
+rehash_tasks: set[asyncio.Task] = set()
+
+
+def to_token_data(claims: dict) -> TokenData:
+    """
+    Build TokenData from verified claims, only the claims we issue are checked
+    instead of running full model validation
+    :param claims:
+    :return:
+    :raises JWTError:
+    """
+    user_id, username = claims.get("id"), claims.get("username")
+    jti, exp = claims.get("jti"), claims.get("exp")
+    if (type(user_id) is not int or type(username) is not str or type(exp) is not int
+            or not (jti is None or type(jti) is str)):
+        raise JWTError("Invalid claims")
+    return TokenData.model_construct(id=user_id, username=username, jti=jti, exp=exp)
+
+
+async def rehash_password(user_id: int, old_hash: str, password: str) -> None:
+    """
+    Replace outdated password hash, skipped when the password was changed in the meantime
+    :param user_id:
+    :param old_hash:
+    :param password:
+    :return:
+    """
+    try:
+        new_hash = await aget_password_hash(password)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(User).where(User.id == user_id, User.password == old_hash).values(password=new_hash)
+            )
+            await db.commit()
+    except Exception:
+        logger.exception(f"Password rehash failed for user {user_id}")
 
 
 class UsersService(BaseService):
+    def __init__(self, db: AsyncSession = Depends(get_db)):
+        super().__init__(db)
+        self.tokens_service = TokensService(db)
+        self.revocation_service = RevocationService(db)
+
+    @staticmethod
+    def filter_active(query, include_inactive: bool = False):
+        # soft deleted users are filtered in SQL, the bare column matches the partial index ix_users_active_id
+        return query if include_inactive else query.where(User.is_active)
 
-    def active_users(self):
-        return self.db.query(User).filter(User.is_active is True)
+    def users_query(self, include_inactive: bool = False):
+        # roles of the whole page are loaded with one extra SELECT ... WHERE user_id IN (...)
+        return self.filter_active(select(User).options(selectinload(User.role)), include_inactive)
 
-    def get_user_by_id(self, user_id: int):
-        return self.db.query(User).filter(User.id == user_id).first()
+    def user_query(self, include_inactive: bool = False):
+        # single user lookups load roles in the same statement
+        return self.filter_active(select(User).options(joinedload(User.role)), include_inactive)
 
-    def get_all_users(self, skip: int = 0, limit: int = 100):
-        return self.db.query(User).offset(skip).limit(limit).all()
+    def use_primary(self) -> None:
+        # reads feeding a write must not see replica lag
+        self.db.sync_session.info[PIN_PRIMARY] = True
 
-    def list_users(self, skip: int = 0, limit: int = 100):
-        return self.db.query(User).offset(skip).limit(limit).all()
+    async def replica_bind(self, user_id: int | None = None, username: str | None = None) -> dict | None:
+        """
+        Bind arguments for a read that a replica may serve, none when the user was written recently.
+        Writes are remembered in recent_writes, other workers only see them with a shared cache backend
+        :param user_id:
+        :param username:
+        :return:
+        """
+        if not replicas:
+            return None
+        if user_id is not None and await recent_writes.get(f"id:{user_id}") is not None:
+            return None
+        if username is not None and await recent_writes.get(f"username:{username.lower()}") is not None:
+            return None
+        return {"replica": True}
 
-    def get_user_by_username(self, username: str):
-        return self.db.query(User).filter(User.username == username).first()
+    async def mark_written(self, user_ids: Iterable[int] = (), usernames: Iterable[str] = ()) -> None:
+        """
+        Keep reads of these users on the primary until replicas caught up with the write
+        :param user_ids:
+        :param usernames:
+        :return:
+        """
+        if not replicas:
+            return
+        keys = [*(f"id:{user_id}" for user_id in user_ids), *(f"username:{name.lower()}" for name in usernames)]
+        for key in keys:
+            await recent_writes.set(key, b"1", ttl=DB_REPLICA_PIN_SECONDS)
+
+    async def get_user_by_id(self, user_id: int):
+        result = await self.db.execute(
+            self.user_query().filter(User.id == user_id), bind_arguments=await self.replica_bind(user_id=user_id)
+        )
+        return result.unique().scalars().first()
+
+    async def get_all_users(self, skip: int = 0, limit: int = 100):
+        result = await self.db.execute(self.users_query().order_by(User.id).offset(skip).limit(limit))
+        return result.scalars().all()
+
+    async def list_users(self, skip: int = 0, limit: int = 100, include_inactive: bool = False):
+        result = await self.db.execute(
+            self.users_query(include_inactive).order_by(User.id).offset(skip).limit(limit),
+            bind_arguments=await self.replica_bind(),
+        )
+        return result.scalars().all()
+
+    async def list_users_after(self, after_id: int | None = None, limit: int = 100, include_inactive: bool = False):
+        """
+        Keyset pagination on primary key, cost does not grow with page number
+        :param after_id: last id of previous page
+        :param limit:
+        :param include_inactive:
+        :return:
+        """
+        query = self.users_query(include_inactive).order_by(User.id).limit(limit)
+        if after_id is not None:
+            query = query.filter(User.id > after_id)
+        result = await self.db.execute(query, bind_arguments=await self.replica_bind())
+        return result.scalars().all()
+
+    async def export_users(self, batch_size: int = 1000, include_inactive: bool = False):
+        """
+        Stream all users with their roles as plain dicts through a server side cursor,
+        rows are not materialized as ORM objects so memory stays constant
+        :param batch_size: rows fetched per round-trip
+        :param include_inactive:
+        :return: async generator of user dicts
+        """
+        query = self.filter_active(
+            select(
+                User.id, User.username, User.first_name, User.last_name, User.email, User.is_active,
+                User.created_at, User.updated_at,
+                UserRole.name.label("role_name"), UserRole.description.label("role_description"),
+            )
+            .outerjoin(UserRole, UserRole.user_id == User.id)
+            .order_by(User.id, UserRole.id)
+            .execution_options(yield_per=batch_size),
+            include_inactive,
+        )
+        result = await self.db.stream(query, bind_arguments=await self.replica_bind())
+        user = None
+        async for row in result:
+            if user is None or user["id"] != row.id:
+                if user is not None:
+                    yield user
+                user = {
+                    "id": row.id,
+                    "username": row.username,
+                    "first_name": row.first_name,
+                    "last_name": row.last_name,
+                    "email": row.email,
+                    "is_active": row.is_active,
+                    "created_at": row.created_at,
+                    "updated_at": row.updated_at,
+                    "role": [],
+                }
+            if row.role_name is not None:
+                user["role"].append({"name": row.role_name, "description": row.role_description})
+        if user is not None:
+            yield user
 
-    def get_active_user_by_id(self, user_id: int):
-        return self.active_users().filter(User.id == user_id).first()
+    async def get_user_by_username(self, username: str):
+        result = await self.db.execute(
+            self.user_query().filter(func.lower(User.username) == username.lower()),
+            bind_arguments=await self.replica_bind(username=username),
+        )
+        return result.unique().scalars().first()
 
-    def create_user(self, user: UserInCreate):
-        user.password = get_password_hash(user.password)
-        db_user = User(
-            **user.dict(),
+    async def create_user(self, user: UserInCreate):
+        """
+        Create user with a single INSERT ... ON CONFLICT DO NOTHING RETURNING,
+        the case-insensitive unique index on username decides whether it is taken
+        :param user:
+        :return:
+        """
+        user.password = await aget_password_hash(user.password)
+        query = (
+            pg_insert(User)
+            .values(**user.model_dump())
+            .on_conflict_do_nothing(index_elements=[func.lower(User.username)])
+            .returning(*User.__table__.c)
         )
-        self.db.add(db_user)
-        self.db.commit()
+        result = await self.db.execute(select(User).from_statement(query))
+        db_user = result.scalars().first()
+        if db_user is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=const.USERNAME_TAKEN)
+        await self.db.commit()
+        await unknown_usernames.delete(db_user.username.lower())
+        await self.mark_written([db_user.id], [db_user.username])
+        # a new user has no roles yet, no need to load them
+        set_committed_value(db_user, "role", [])
         return db_user
 
-    def update_user(self, user_id: int, user: UserUpdate):
-        db_user = self.get_user_by_id(user_id=user_id)
-        for var, value in vars(user).items():
-            if value:
-                setattr(db_user, var, value)
-        self.db.commit()
+    async def create_users(self, users: list[UserInCreate]) -> list[dict]:
+        """
+        Create many users at once: parallel hashing, one IN query for taken usernames
+        and a single multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING.
+        Passwords are hashed before the first query, the transaction is not kept open while hashing
+        :param users:
+        :return: per item result in input order
+        """
+        # first occurrence of every username in the batch, repeats are conflicts
+        candidates = {}
+        seen = set()
+        for index, user in enumerate(users):
+            if user.username.lower() not in seen:
+                seen.add(user.username.lower())
+                candidates[index] = user
+        hashes = await security.aget_password_hashes([user.password for user in candidates.values()])
+
+        result = await self.db.execute(
+            select(func.lower(User.username)).filter(func.lower(User.username).in_(seen))
+        )
+        taken = set(result.scalars().all())
+        to_create = {
+            index: (user, password_hash)
+            for (index, user), password_hash in zip(candidates.items(), hashes)
+            if user.username.lower() not in taken
+        }
+
+        created = {}
+        if to_create:
+            query = (
+                pg_insert(User)
+                .values([
+                    {**user.model_dump(), "password": password_hash}
+                    for user, password_hash in to_create.values()
+                ])
+                .on_conflict_do_nothing(index_elements=[func.lower(User.username)])
+                .returning(User.id, User.username)
+            )
+            result = await self.db.execute(query)
+            created = {row.username: row.id for row in result}
+            await self.db.commit()
+            await unknown_usernames.delete(*(username.lower() for username in created))
+            await self.mark_written(created.values(), created)
+
+        results = []
+        for index, user in enumerate(users):
+            user_id = created.get(user.username) if index in to_create else None
+            results.append({
+                "username": user.username,
+                "id": user_id,
+                "status": BatchItemStatusChoices.CONFLICT if user_id is None else BatchItemStatusChoices.CREATED,
+            })
+        return results
+
+    async def update_user(self, user_id: int, user: UserUpdate):
+        """
+        Set the given fields with a single UPDATE ... RETURNING, roles of the updated row
+        are joined in the same statement
+        :param user_id:
+        :param user:
+        :return: updated user, None when there is no active user with this id
+        """
+        values = {field: value for field, value in user.model_dump().items() if value}
+        if not values:
+            return await self.get_user_by_id(user_id=user_id)
+        if "password" in values:
+            values["password"] = await aget_password_hash(values["password"])
+        updated = (
+            update(User)
+            .where(User.id == user_id, User.is_active)
+            .values(**values)
+            .returning(*User.__table__.c)
+            .cte("updated_user")
+        )
+        updated_user = aliased(User, updated)
+        query = (
+            select(updated_user)
+            .outerjoin(UserRole, UserRole.user_id == updated_user.id)
+            .options(contains_eager(updated_user.role))
+            .execution_options(populate_existing=True)
+        )
+        try:
+            result = await self.db.execute(query)
+            db_user = result.unique().scalars().first()
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=const.USERNAME_TAKEN)
+        if db_user is None:
+            return None
+        await self.invalidate_user_cache(user_id)
+        if user.username:
+            await unknown_usernames.delete(user.username.lower())
+        await self.mark_written([user_id], [db_user.username])
+        if "password" in values:
+            await self.tokens_service.revoke_user_tokens(user_id)
         return db_user
 
-    def delete_user(self, user_id: int):
-        db_user = self.get_user_by_id(user_id=user_id)
-        db_user.is_active = False
-        self.db.commit()
+    async def delete_user(self, user_id: int):
+        """
+        Soft delete with a single UPDATE ... RETURNING
+        :param user_id:
+        :return: id and username, None when there is no active user with this id
+        """
+        result = await self.db.execute(
+            update(User)
+            .where(User.id == user_id, User.is_active)
+            .values(is_active=False)
+            .returning(User.id, User.username)
+            .execution_options(synchronize_session=False)
+        )
+        db_user = result.first()
+        if db_user is None:
+            return None
+        await self.db.commit()
+        await self.invalidate_user_cache(user_id)
+        await self.mark_written([user_id], [db_user.username])
+        await self.tokens_service.revoke_user_tokens(user_id)
         return db_user
 
-    def check_password(self, user: User, password: str) -> bool:
-        return security.verify_password(password, user.password)
+    async def invalidate_user_cache(self, user_id: int) -> None:
+        await user_cache.delete(str(user_id), f"role:{user_id}")
+
+    async def authenticate(self, username: str, password: str) -> User | None:
+        """
+        Find user and check password. Unknown usernames are remembered for a while and
+        verified against a dummy hash, so they cost no query and take as long as a wrong password
+        :param username:
+        :param password:
+        :return: user, None when username or password is wrong
+        """
+        db_user = None
+        if await unknown_usernames.get(username.lower()) is None:
+            db_user = await self.get_user_by_username(username)
+            if db_user is None and replicas and not self.db.sync_session.info.get(PIN_PRIMARY):
+                # a lagging replica may not have the user yet, only the primary decides it is unknown
+                self.use_primary()
+                db_user = await self.get_user_by_username(username)
+            if db_user is None:
+                await unknown_usernames.set(username.lower(), b"1", ttl=UNKNOWN_USERNAME_CACHE_TTL)
+        if db_user is None:
+            await security.adummy_verify()
+            return None
+        if not await self.check_password(db_user, password):
+            return None
+        return db_user
+
+    async def check_password(self, user: User, password: str) -> bool:
+        """
+        Verify password, hashes made with an old scheme or cost are upgraded in the background
+        :param user:
+        :param password:
+        :return:
+        """
+        is_valid = await security.averify_password(password, user.password)
+        if is_valid and security.password_needs_rehash(user.password):
+            task = asyncio.create_task(rehash_password(user.id, user.password, password))
+            rehash_tasks.add(task)
+            task.add_done_callback(rehash_tasks.discard)
+        return is_valid
 
     def create_access_token(self, user: User, expires_delta: timedelta | None = None):
         """
@@ -74,27 +412,146 @@ class UsersService(BaseService):
         data = TokenData(id=user.id, username=user.username)
         return security.create_access_token(data=data.model_dump(), expires_delta=expires_delta)
 
-    def get_user_by_token(self, token: str):
+    async def create_tokens(self, user: User) -> Token:
         """
-        Get user by token
+        Create short-lived access token and a refresh token starting a new family
+        :param user:
+        :return:
+        """
+        return Token(
+            access_token=self.create_access_token(user),
+            token_type=JWT_TOKEN_PREFIX,
+            refresh_token=await self.tokens_service.create_refresh_token(user.id),
+        )
+
+    async def refresh_tokens(self, refresh_token: str) -> Token | None:
+        """
+        Rotate refresh token and issue new access token, refused for unknown and inactive users
+        :param refresh_token:
+        :return:
+        """
+        rotated = await self.tokens_service.rotate_refresh_token(refresh_token)
+        if rotated is None:
+            return None
+        user_id, new_refresh_token = rotated
+        user = await self.get_user_snapshot(user_id=user_id)
+        if user is None:
+            await self.tokens_service.revoke_user_tokens(user_id)
+            return None
+        return Token(
+            access_token=self.create_access_token(user),
+            token_type=JWT_TOKEN_PREFIX,
+            refresh_token=new_refresh_token,
+        )
+
+    def get_token_data(self, token: str) -> TokenData | None:
+        """
+        Decode and verify token, verified claims are cached until the token expires
         :param token:
         :return:
         """
+        token_data = claims_cache.get(token)
+        if token_data is not None:
+            return token_data
         try:
-            payload = jwt.decode(token, str(SECRET_KEY), algorithms=[ALGORITHM])
-            payload.pop('exp')
-            token_data = TokenData(**payload)
-            if token_data.id is None:
-                return None
+            token_data = to_token_data(security.decode_access_token(token))
         except JWTError:
             return None
-        user = self.get_user_by_id(user_id=token_data.id)
+        claims_cache.set(token, token_data, ttl=token_data.exp - time.time())
+        return token_data
+
+    async def is_token_revoked(self, token_data: TokenData) -> bool:
+        # tokens issued without jti can not be revoked, they expire on their own
+        if token_data.jti is None:
+            return False
+        return await self.revocation_service.is_revoked(token_data.jti)
+
+    async def introspect_tokens(self, tokens: list[str]) -> list[dict]:
+        """
+        Validate many tokens at once: claims are decoded in one pass, revocations and
+        user states are loaded with one IN query each
+        :param tokens:
+        :return: active flag and claims per token, in input order
+        """
+        claims = [self.get_token_data(token) for token in tokens]
+        valid = [token_data for token_data in claims if token_data is not None]
+        if not valid:
+            return [{"active": False, "claims": None} for _ in tokens]
+
+        revoked = await self.revocation_service.revoked_jtis(
+            [token_data.jti for token_data in valid if token_data.jti is not None]
+        )
+        result = await self.db.execute(
+            select(User.id).where(User.id.in_({token_data.id for token_data in valid}), User.is_active)
+        )
+        active_users = set(result.scalars().all())
+
+        results = []
+        for token_data in claims:
+            active = token_data is not None and token_data.id in active_users and token_data.jti not in revoked
+            results.append({"active": active, "claims": token_data if active else None})
+        return results
+
+    async def revoke_token(self, token_data: TokenData) -> None:
+        if token_data.jti is None:
+            return
+        await self.revocation_service.revoke(
+            jti=token_data.jti,
+            user_id=token_data.id,
+            expires_at=datetime.fromtimestamp(token_data.exp, tz=timezone.utc),
+        )
+
+    async def get_user_by_token(self, token: str):
+        """
+        Get user by token
+        :param token:
+        :return:
+        """
+        token_data = self.get_token_data(token)
+        if token_data is None:
+            return None
+        user = await self.get_user_by_id(user_id=token_data.id)
         if user is None:
             return None
         return user
 
-    def check_role(self, user_id: int):
-        role_exists = self.db.query(UserRole).filter(UserRole.user_id == user_id).first()
+    async def get_user_snapshot(self, user_id: int) -> UserResponse | None:
+        """
+        Get cached read-only snapshot of user, loaded from database on cache miss
+        :param user_id:
+        :return:
+        """
+        cached = await self.get_user_snapshot_json(user_id=user_id)
+        if cached is None:
+            return None
+        return user_response_adapter.validate_json(cached)
+
+    async def get_user_snapshot_json(self, user_id: int) -> bytes | None:
+        """
+        Get cached snapshot of user as the JSON body of UserResponse, served without parsing it
+        :param user_id:
+        :return:
+        """
+        cached = await user_cache.get(str(user_id))
+        if cached is not None:
+            return cached
+        user = await self.get_user_by_id(user_id=user_id)
+        if user is None:
+            return None
+        snapshot = user_response_adapter.dump_json(UserResponse.from_row(user))
+        await user_cache.set(str(user_id), snapshot, ttl=USER_CACHE_TTL)
+        return snapshot
+
+    async def check_role(self, user_id: int) -> bool:
+        cached = await user_cache.get(f"role:{user_id}")
+        if cached is not None:
+            return cached == b"1"
+        result = await self.db.execute(
+            select(UserRole.id).filter(UserRole.user_id == user_id).limit(1),
+            bind_arguments=await self.replica_bind(user_id=user_id),
+        )
+        role_exists = result.scalar() is not None
+        await user_cache.set(f"role:{user_id}", b"1" if role_exists else b"0", ttl=USER_CACHE_TTL)
         return role_exists
 
     def get_user_or_raise_error(self, db_user):
@@ -104,45 +561,76 @@ class UsersService(BaseService):
             )
         return db_user
 
-    def create_role(self, user_id, role: Role):
-        db_user = self.get_user_by_id(user_id=user_id)
+    async def create_role(self, user_id, role: Role):
+        self.use_primary()
+        db_user = await self.get_user_by_id(user_id=user_id)
         self.get_user_or_raise_error(db_user)
-        if self.check_role(user_id=user_id):
+        if await self.check_role(user_id=user_id):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail=const.ROLE_EXISTS
             )
         db_role = UserRole(**role.model_dump(), user_id=db_user.id)
         self.db.add(db_role)
-        self.db.commit()
-        self.db.refresh(db_role)
+        await self.db.commit()
+        await self.db.refresh(db_role)
+        await self.invalidate_user_cache(user_id)
+        await self.mark_written([user_id])
         return db_role
 
-    def change_password(self, user_id: int, password: ChangePasswordIn):
-        db_user = self.get_user_by_id(user_id=user_id)
-        self.get_user_or_raise_error(db_user)
+    async def change_password(self, user_id: int, password: ChangePasswordIn):
+        """
+        Check current password and store the new hash with a conditional UPDATE ... RETURNING.
+        When the hash changed in the meantime the current password is checked once more against it,
+        so a concurrent rehash goes through and a concurrent password change is rejected
+        :param user_id:
+        :param password:
+        :return:
+        """
         if password.new_password != password.confirm_password:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail=const.PASSWORD_NOT_MATCH
             )
-
-        if not self.check_password(db_user, password.current_password):
+        self.use_primary()
+        new_hash = None
+        for _ in range(2):
+            result = await self.db.execute(
+                select(User.id, User.username, User.password).where(User.id == user_id, User.is_active)
+            )
+            db_user = result.first()
+            self.get_user_or_raise_error(db_user)
+            # no check_password here, the rehash it may start would race the conditional update
+            if not await security.averify_password(password.current_password, db_user.password):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST, detail=const.INCORRECT_PASSWORD
+                )
+            new_hash = new_hash or await aget_password_hash(password.new_password)
+            result = await self.db.execute(
+                update(User)
+                .where(User.id == user_id, User.password == db_user.password)
+                .values(password=new_hash)
+                .returning(User.id, User.username)
+                .execution_options(synchronize_session=False)
+            )
+            db_user = result.first()
+            if db_user is not None:
+                break
+            # the hash changed after it was read (e.g. upgraded by the rehash of a login), check it again
+        else:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail=const.INCORRECT_PASSWORD
             )
-        db_user.password = get_password_hash(password.new_password)
-        self.db.commit()
-        self.db.refresh(db_user)
+        await self.db.commit()
+        await self.invalidate_user_cache(user_id)
+        await self.mark_written([user_id], [db_user.username])
+        await self.tokens_service.revoke_user_tokens(user_id)
 
         # return self.create_access_token(db_user)
         return ChangePasswordOut(
-            token=Token(
-                access_token=self.create_access_token(db_user),
-                token_type=JWT_TOKEN_PREFIX
-            )
+            token=await self.create_tokens(db_user)
         )
 
-    def check_user_attrs(self, user_id, **kwargs):
-        user = self.get_user_by_id(user_id=user_id)
+    async def check_user_attrs(self, user_id, **kwargs):
+        user = await self.get_user_by_id(user_id=user_id)
         self.get_user_or_raise_error(user)
         for key, value in kwargs.items():
             if getattr(user, key) != value:
@@ -159,23 +647,22 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)],
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, str(SECRET_KEY), algorithms=[ALGORITHM])
-        payload.pop('exp')
-        token_data = TokenData(**payload)
-        if token_data.id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = user_service.get_user_by_id(user_id=token_data.id)
-    if user is None:
+    # access tokens are short-lived, verified claims are trusted without a database lookup
+    token_data = user_service.get_token_data(token)
+    if token_data is None or await user_service.is_token_revoked(token_data):
         raise credentials_exception
-    return user
+    return token_data
 
 
 async def get_current_active_user(
-        current_user: Annotated[User, Depends(get_current_user)]
+        current_user: Annotated[TokenData, Depends(get_current_user)],
+        user_service: UsersService = Depends(get_service(UsersService))
 ):
-    if not current_user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
+    # only the existence of the cached snapshot is checked, the JSON body is not parsed
+    if await user_service.get_user_snapshot_json(user_id=current_user.id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return current_user
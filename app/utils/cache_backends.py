@@ -0,0 +1,384 @@
+"""
+Cache backends with a common async interface, values are bytes.
+
+* MemoryCacheBackend - in-process LRU, every worker has its own copy,
+  so invalidations are only seen by the worker that made them.
+* SharedMemoryCacheBackend - fixed size table in a memory mapped file shared
+  by all workers on the host, writes and deletes are visible to all of them at once.
+* RedisCacheBackend - minimal Redis protocol client with a small connection pool, works with
+  Redis and compatible servers. An optional near cache keeps hot entries in process, deletes
+  are published on a channel so the near caches of other workers drop them too.
+"""
+import asyncio
+import hashlib
+import mmap
+import os
+import struct
+import time
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from app.utils.cache import TTLCache
+
+
+class CacheBackend(ABC):
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        """
+        Remove keys for all workers sharing the backend
+        :param keys:
+        :return:
+        """
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+    async def listen_invalidations(self) -> None:
+        """
+        Apply deletes made by other workers, runs until cancelled. Nothing to do for backends without local state
+        :return:
+        """
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> bytes | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.delete(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class SharedMemoryCacheBackend(CacheBackend):
+    """
+    Direct-mapped table of ``slots`` fixed size slots in a file under ``directory``, put it on
+    tmpfs (e.g. /dev/shm) to keep it in memory. A key lives in the slot picked by its hash,
+    a colliding key overwrites it. Entries not fitting into ``slot_size`` bytes are not cached.
+    Access is serialized between processes with flock.
+    """
+    # expires at (unix time), key length, value length
+    HEADER = struct.Struct("<dHI")
+
+    def __init__(self, directory: str, name: str, slots: int, slot_size: int = 1024):
+        import fcntl
+        self._fcntl = fcntl
+        self.slots = slots
+        self.slot_size = slot_size
+        self.path = os.path.join(directory, f"{name}-{slots}x{slot_size}.cache")
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = slots * slot_size
+        if os.fstat(self._fd).st_size != size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def _offset(self, key: bytes) -> int:
+        digest = hashlib.blake2b(key, digest_size=8).digest()
+        return int.from_bytes(digest, "little") % self.slots * self.slot_size
+
+    def _read(self, offset: int, key: bytes) -> bytes | None:
+        expires_at, key_length, value_length = self.HEADER.unpack_from(self._map, offset)
+        start = offset + self.HEADER.size
+        if expires_at <= time.time() or self._map[start:start + key_length] != key:
+            return None
+        start += key_length
+        return self._map[start:start + value_length]
+
+    async def get(self, key: str) -> bytes | None:
+        key = key.encode()
+        offset = self._offset(key)
+        self._fcntl.flock(self._fd, self._fcntl.LOCK_SH)
+        try:
+            value = self._read(offset, key)
+        finally:
+            self._fcntl.flock(self._fd, self._fcntl.LOCK_UN)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        key = key.encode()
+        if ttl <= 0 or self.HEADER.size + len(key) + len(value) > self.slot_size:
+            return
+        offset = self._offset(key)
+        start = offset + self.HEADER.size
+        self._fcntl.flock(self._fd, self._fcntl.LOCK_EX)
+        try:
+            self._map[start:start + len(key) + len(value)] = key + value
+            self.HEADER.pack_into(self._map, offset, time.time() + ttl, len(key), len(value))
+        finally:
+            self._fcntl.flock(self._fd, self._fcntl.LOCK_UN)
+
+    async def delete(self, *keys: str) -> None:
+        self._fcntl.flock(self._fd, self._fcntl.LOCK_EX)
+        try:
+            for key in keys:
+                key = key.encode()
+                offset = self._offset(key)
+                if self._read(offset, key) is not None:
+                    self.HEADER.pack_into(self._map, offset, 0, 0, 0)
+        finally:
+            self._fcntl.flock(self._fd, self._fcntl.LOCK_UN)
+
+    def stats(self) -> dict:
+        return {"backend": "shm", "slots": self.slots, "hits": self.hits, "misses": self.misses}
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisConnection:
+    """
+    Single connection speaking RESP2, one command at a time
+    """
+
+    def __init__(self, url: str, timeout: float = 1):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def pack(*args: str | bytes | int) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    async def read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, data = line[:1], line[1:-2]
+        if kind == b"+":
+            return data
+        if kind == b"-":
+            raise RedisError(data.decode())
+        if kind == b":":
+            return int(data)
+        if kind == b"$":
+            if data == b"-1":
+                return None
+            value = await self._reader.readexactly(int(data) + 2)
+            return value[:-2]
+        if kind == b"*":
+            if data == b"-1":
+                return None
+            return [await self.read_reply() for _ in range(int(data))]
+        raise RedisError(f"Unexpected reply {line!r}")
+
+    async def connect(self) -> None:
+        """
+        Open the connection and authenticate, all within ``timeout``; closed again on failure
+        :return:
+        """
+        try:
+            await asyncio.wait_for(self._connect(), self.timeout)
+        except BaseException:
+            await self.close()
+            raise
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._send("AUTH", self.password)
+        if self.db:
+            await self._send("SELECT", self.db)
+
+    async def _send(self, *args):
+        self._writer.write(self.pack(*args))
+        await self._writer.drain()
+        return await self.read_reply()
+
+    async def execute(self, *args):
+        async with self._lock:
+            if self._writer is None:
+                await self.connect()
+            try:
+                return await asyncio.wait_for(self._send(*args), self.timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                # the reply may still arrive later, start over on a fresh connection
+                await self.close()
+                raise
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+class RedisConnectionPool:
+    """
+    Up to ``size`` connections running commands concurrently. After a connection error every
+    command fails at once for a backoff period, doubled on each failure up to ``max_backoff``,
+    instead of each of them waiting for its own connect timeout while Redis is down
+    """
+
+    def __init__(self, url: str, size: int = 8, timeout: float = 1, backoff: float = 0.5, max_backoff: float = 30):
+        self.url = url
+        self.timeout = timeout
+        self.min_backoff = backoff
+        self.max_backoff = max_backoff
+        self._backoff = backoff
+        self._unavailable_until = 0.0
+        self._idle: list[RedisConnection] = []
+        self._semaphore = asyncio.Semaphore(size)
+
+    def _check_available(self) -> None:
+        if time.monotonic() < self._unavailable_until:
+            raise ConnectionError("Redis unavailable, backing off after a connection error")
+
+    async def execute(self, *args):
+        self._check_available()
+        async with self._semaphore:
+            # the failure of another command may have started a backoff while waiting
+            self._check_available()
+            connection = self._idle.pop() if self._idle else RedisConnection(self.url, timeout=self.timeout)
+            try:
+                result = await connection.execute(*args)
+            except RedisError:
+                # error reply, the connection is fine
+                self._idle.append(connection)
+                raise
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                await connection.close()
+                self._unavailable_until = time.monotonic() + self._backoff
+                self._backoff = min(self._backoff * 2, self.max_backoff)
+                raise
+            self._backoff = self.min_backoff
+            self._idle.append(connection)
+            return result
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await connection.close()
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Keys are stored with ``prefix``. Redis errors are logged and treated as cache misses,
+    so the service keeps working from the database while Redis is down.
+    """
+
+    def __init__(self, url: str, prefix: str, near_cache_size: int = 0, near_cache_ttl: float = 0,
+                 timeout: float = 1, pool_size: int = 8):
+        self.url = url
+        self.prefix = prefix
+        self.timeout = timeout
+        self.channel = f"{prefix}invalidate"
+        self._pool = RedisConnectionPool(url, size=pool_size, timeout=timeout)
+        self._near_cache = TTLCache(maxsize=near_cache_size, ttl=near_cache_ttl) if near_cache_size else None
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def _execute(self, *args):
+        try:
+            return await self._pool.execute(*args)
+        except (OSError, RedisError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            self.errors += 1
+            logger.warning(f"Redis cache command {args[0]} failed: {e!r}")
+            return None
+
+    async def get(self, key: str) -> bytes | None:
+        if self._near_cache is not None:
+            value = self._near_cache.get(key)
+            if value is not None:
+                return value
+        value = await self._execute("GET", self.prefix + key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self._near_cache is not None:
+            self._near_cache.set(key, value)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        await self._execute("SET", self.prefix + key, value, "PX", int(ttl * 1000))
+        if self._near_cache is not None:
+            self._near_cache.set(key, value, ttl=ttl)
+
+    async def delete(self, *keys: str) -> None:
+        if not keys:
+            return
+        if self._near_cache is not None:
+            for key in keys:
+                self._near_cache.delete(key)
+        await self._execute("DEL", *(self.prefix + key for key in keys))
+        if self._near_cache is not None:
+            await self._execute("PUBLISH", self.channel, "\n".join(keys))
+
+    async def listen_invalidations(self, retry_interval: float = 1) -> None:
+        if self._near_cache is None:
+            return
+        while True:
+            connection = RedisConnection(self.url, timeout=self.timeout)
+            try:
+                await connection.connect()
+                await connection.execute("SUBSCRIBE", self.channel)
+                # deletes published while disconnected are lost, start from scratch
+                self._near_cache.clear()
+                while True:
+                    message = await connection.read_reply()
+                    if message[0] == b"message":
+                        for key in message[2].decode().split("\n"):
+                            self._near_cache.delete(key)
+            except (OSError, RedisError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                logger.warning(f"Redis invalidation subscription failed: {e!r}")
+                self._near_cache.clear()
+            finally:
+                await connection.close()
+            await asyncio.sleep(retry_interval)
+
+    def stats(self) -> dict:
+        stats = {"backend": "redis", "hits": self.hits, "misses": self.misses, "errors": self.errors}
+        if self._near_cache is not None:
+            stats["near_cache"] = self._near_cache.stats()
+        return stats
+
+    async def close(self) -> None:
+        await self._pool.close()
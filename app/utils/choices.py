@@ -5,3 +5,19 @@ class UserRoleChoices(str, Enum):
     VIEWER = "viewer"
     ADMIN = "admin"
     SUPER_ADMIN = "super_admin"
+
+
+class ExportFormatChoices(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class BatchItemStatusChoices(str, Enum):
+    CREATED = "created"
+    CONFLICT = "conflict"
+
+
+class CacheBackendChoices(str, Enum):
+    MEMORY = "memory"
+    SHM = "shm"
+    REDIS = "redis"
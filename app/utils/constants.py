@@ -8,3 +8,9 @@ PASSWORD_NOT_MATCH = "passwords do not match"
 INCORRECT_PASSWORD = "incorrect password"
 PASSWORD_SUCCESSFULLY_CHANGED = "password successfully changed"
 USER_INFORMATION_DOES_NOT_MATCH = "user information does not match"
+SERVICE_BUSY = "service is busy, try again later"
+TOKEN_REVOKED = "token successfully revoked"
+INVALID_REFRESH_TOKEN = "invalid refresh token"
+INVALID_CURSOR = "invalid cursor"
+BATCH_TOO_LARGE = "batch is too large"
+TOO_MANY_LOGIN_ATTEMPTS = "too many login attempts, try again later"
@@ -0,0 +1,54 @@
+import csv
+import datetime
+import io
+from typing import AsyncIterator
+
+import orjson
+
+from app.db.domain.base import convert_datetime_to_realword
+
+EXPORT_FIELDS = ["id", "username", "first_name", "last_name", "email", "is_active", "created_at", "updated_at", "role"]
+
+
+def _default(value):
+    if isinstance(value, datetime.datetime):
+        return convert_datetime_to_realword(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def to_ndjson(users: AsyncIterator[dict], chunk_size: int = 1000) -> AsyncIterator[bytes]:
+    lines = []
+    async for user in users:
+        # datetimes go through _default to keep the format of the API responses
+        lines.append(orjson.dumps(user, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME))
+        if len(lines) >= chunk_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+async def to_csv(users: AsyncIterator[dict], chunk_size: int = 1000) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    rows = 0
+    async for user in users:
+        writer.writerow([
+            user["id"],
+            user["username"],
+            user["first_name"],
+            user["last_name"],
+            user["email"],
+            user["is_active"],
+            convert_datetime_to_realword(user["created_at"]) if user["created_at"] else None,
+            convert_datetime_to_realword(user["updated_at"]) if user["updated_at"] else None,
+            ";".join(role["name"] for role in user["role"]),
+        ])
+        rows += 1
+        if rows >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue()
@@ -0,0 +1,63 @@
+"""
+Local verification of auth service tokens for other services.
+
+Only depends on python-jose and the standard library, so it can be copied
+into or installed alongside any service:
+
+    verifier = JWKSVerifier("https://auth.example.com/.well-known/jwks.json")
+    claims = verifier.verify(token)  # raises jose.JWTError when the token is not valid
+"""
+import json
+import threading
+import time
+import urllib.request
+from typing import Sequence
+
+from jose import JWTError, jwk, jwt
+
+
+class JWKSVerifier:
+    """
+    Verify tokens with public keys fetched from a JWKS endpoint. Keys are cached
+    for ``cache_ttl`` seconds, a token with an unknown ``kid`` triggers a refetch
+    (at most once per ``min_refresh_interval`` seconds) so key rotation needs no restart.
+    """
+
+    def __init__(self, jwks_url: str, algorithms: Sequence[str] = ("RS256", "ES256"),
+                 cache_ttl: float = 300, min_refresh_interval: float = 30, timeout: float = 5):
+        self.jwks_url = jwks_url
+        self.algorithms = list(algorithms)
+        self.cache_ttl = cache_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._keys: dict = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def _fetch(self) -> None:
+        with urllib.request.urlopen(self.jwks_url, timeout=self.timeout) as response:
+            document = json.load(response)
+        self._keys = {
+            key["kid"]: jwk.construct(key, key.get("alg"))
+            for key in document.get("keys", [])
+            if key.get("alg") in self.algorithms
+        }
+        self._fetched_at = time.monotonic()
+
+    def get_key(self, kid: str | None):
+        with self._lock:
+            age = time.monotonic() - self._fetched_at
+            if age > self.cache_ttl or (kid not in self._keys and age > self.min_refresh_interval):
+                self._fetch()
+            return self._keys.get(kid)
+
+    def verify(self, token: str) -> dict:
+        """
+        Verify signature and expiry of the token
+        :param token:
+        :return: claims
+        """
+        key = self.get_key(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            raise JWTError("Unknown key id")
+        return jwt.decode(token, key, algorithms=self.algorithms)
@@ -0,0 +1,69 @@
+import heapq
+import time
+from abc import ABC, abstractmethod
+
+
+class RateLimitBackend(ABC):
+    """
+    Storage for sliding window counters. Implement it on top of a shared store
+    (e.g. Redis INCR/EXPIRE on two fixed windows) to limit across workers.
+    """
+
+    @abstractmethod
+    async def hit(self, key: str, window: float) -> float:
+        """
+        Count an attempt
+        :param key:
+        :param window: seconds
+        :return: estimated number of attempts in the last ``window`` seconds, this one included
+        """
+
+    @abstractmethod
+    async def reset(self, key: str) -> None:
+        ...
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    In-process sliding window counters, only limits attempts seen by the current worker.
+    The window is approximated from the counts of the current and the previous fixed
+    window, so a key costs three numbers regardless of the attempt rate. Beyond ``max_keys``
+    keys the ones with the fewest attempts are dropped.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> [fixed window index, attempts in it, attempts in the previous one]
+        self._windows: dict[str, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    async def hit(self, key: str, window: float) -> float:
+        index, offset = divmod(time.monotonic(), window)
+        entry = self._windows.get(key)
+        if entry is None or entry[0] < index - 1:
+            entry = self._windows[key] = [index, 0, 0]
+        elif entry[0] < index:
+            entry[:] = [index, 0, entry[1]]
+        entry[1] += 1
+        if len(self._windows) > self.max_keys:
+            self._prune(index)
+        return entry[1] + entry[2] * (1 - offset / window)
+
+    async def reset(self, key: str) -> None:
+        self._windows.pop(key, None)
+
+    def _prune(self, index: float) -> None:
+        windows = self._windows
+        for key in [key for key, entry in windows.items() if entry[0] < index - 1]:
+            del windows[key]
+        excess = len(windows) - self.max_keys
+        if excess <= 0:
+            return
+        # everything is recent: drop the keys with the fewest attempts, the oldest first among equals,
+        # so spraying new keys can not flush the counter of a key under attack; a tenth of the keys
+        # goes at once to keep pruning rare
+        excess += self.max_keys // 10
+        for key in heapq.nsmallest(excess, windows, key=lambda key: windows[key][1] + windows[key][2]):
+            del windows[key]
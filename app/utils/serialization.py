@@ -0,0 +1,9 @@
+from starlette.responses import Response
+
+
+class RawJSONResponse(Response):
+    """
+    Response for a body already serialized to JSON, sent as is. Returning it skips FastAPI
+    validating the result against response_model and encoding it once more
+    """
+    media_type = "application/json"
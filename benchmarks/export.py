@@ -0,0 +1,112 @@
+"""
+Streams /api/user/export in both formats and reports rows/sec and, in process, the growth of
+the resident memory while the export runs, which should not depend on the number of users.
+In process the export is read straight from the ASGI app, the httpx transport would buffer
+the whole body. Seeding leaves memory behind that the export reuses, measure with a second run:
+
+    python -m benchmarks.export --users 1000000
+    python -m benchmarks.export --keep-data
+"""
+import asyncio
+import os
+import sys
+import time
+from typing import AsyncIterator
+
+from benchmarks.common import argument_parser, configure, http_client, reset_database, seed_users, started_application
+
+
+def resident_memory() -> int:
+    """
+    :return: resident set size of this process in bytes, Linux only
+    """
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+async def stream_from_server(url: str, export_format: str) -> AsyncIterator[bytes]:
+    async with http_client(url) as client:
+        async with client.stream("GET", "/api/user/export", params={"format": export_format}) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                yield chunk
+
+
+async def stream_from_app(application, export_format: str) -> AsyncIterator[bytes]:
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=16)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/api/user/export", "raw_path": b"/api/user/export",
+        "query_string": f"format={export_format}".encode(), "root_path": "", "headers": [],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive() -> dict:
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # the streaming response waits for a disconnect while it sends
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+        elif message["type"] == "http.response.body":
+            await chunks.put(message.get("body", b""))
+            if not message.get("more_body", False):
+                await chunks.put(None)
+
+    request = asyncio.create_task(application(scope, receive, send))
+    while (chunk := await chunks.get()) is not None:
+        yield chunk
+    finished.set()
+    await request
+
+
+async def export(chunks: AsyncIterator[bytes], export_format: str) -> tuple[int, int, float, int]:
+    """
+    :param chunks: body of the export
+    :param export_format: ndjson or csv
+    :return: rows, bytes, seconds and peak growth of the resident memory
+    """
+    baseline = peak = resident_memory()
+    lines = size = 0
+    start = time.perf_counter()
+    async for chunk in chunks:
+        lines += chunk.count(b"\n")
+        size += len(chunk)
+        peak = max(peak, resident_memory())
+    seconds = time.perf_counter() - start
+    # the csv header is a line as well
+    return lines - (export_format == "csv"), size, seconds, peak - baseline
+
+
+async def main() -> None:
+    parser = argument_parser(__doc__, load=False)
+    parser.add_argument("--users", type=int, default=1000000)
+    args = parser.parse_args()
+    configure()
+
+    if not args.keep_data:
+        reset_database()
+        seed_users(args.users)
+    for export_format in ("ndjson", "csv"):
+        if args.url:
+            rows, size, seconds, growth = await export(stream_from_server(args.url, export_format), export_format)
+        else:
+            async with started_application() as application:
+                rows, size, seconds, growth = await export(stream_from_app(application, export_format), export_format)
+        memory = "" if args.url else f"  memory growth {growth / 2 ** 20:6.1f} MiB"
+        print(
+            f"{export_format:6}  {rows} rows  {size / 2 ** 20:7.1f} MiB  {seconds:6.2f} s  "
+            f"{rows / seconds:9.0f} rows/s{memory}"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
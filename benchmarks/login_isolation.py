@@ -0,0 +1,57 @@
+"""
+Latency of GET /api/auth/me while POST /api/auth/login keeps the password hashing workers busy.
+The probes run one at a time, first on an idle service, then under ``--concurrency`` concurrent
+logins; logins rejected with 503 show the hashing queue limit at work.
+
+    python -m benchmarks.login_isolation --requests 500 --concurrency 50
+"""
+import asyncio
+import sys
+
+from benchmarks.common import (argument_parser, configure, existing_user_ids, http_client, reset_database, run_load,
+                               seed_users)
+
+
+async def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+    # the load logs in over and over from one address
+    configure(LOGIN_THROTTLE_USERNAME_LIMIT="0", LOGIN_THROTTLE_IP_LIMIT="0")
+
+    if args.keep_data:
+        ids = existing_user_ids()
+    else:
+        reset_database()
+        ids = seed_users(args.users)
+    async with http_client(args.url) as client:
+        response = await client.post("/api/auth/login", json={"username": "user0", "password": "password"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        def probe(number: int):
+            return client.get("/api/auth/me", headers=headers)
+
+        idle = await run_load(probe, args.requests, 1)
+
+        logins = {}
+        stopped = asyncio.Event()
+
+        async def log_in(number: int) -> None:
+            while not stopped.is_set():
+                body = {"username": f"user{number % len(ids)}", "password": "password"}
+                response = await client.post("/api/auth/login", json=body)
+                logins[response.status_code] = logins.get(response.status_code, 0) + 1
+                number += args.concurrency
+
+        load = [asyncio.create_task(log_in(number)) for number in range(args.concurrency)]
+        await asyncio.sleep(0.5)
+        loaded = await run_load(probe, args.requests, 1)
+        stopped.set()
+        await asyncio.gather(*load)
+    print(f"GET /api/auth/me  idle                        {idle}")
+    print(f"GET /api/auth/me  {args.concurrency:4} concurrent logins      {loaded}")
+    print(f"POST /api/auth/login responses by status: {dict(sorted(logins.items()))}")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,67 @@
+"""
+Time MetricsMiddleware adds per request: a minimal ASGI app that answers 200 is called directly,
+with and without the middleware in front, so routing, the database and the client do not count.
+Uses the DEBUG setting of the environment, the debug headers cost extra.
+
+    python -m benchmarks.middleware_overhead --requests 200000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROUTE = type("Route", (), {"name": "users:get-user-by-id"})()
+START = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]}
+BODY = {"type": "http.response.body", "body": b"{}"}
+
+
+async def endpoint(scope, receive, send) -> None:
+    scope["route"] = ROUTE
+    await send(START)
+    await send(BODY)
+
+
+async def receive() -> dict:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message: dict) -> None:
+    pass
+
+
+async def time_requests(application, requests: int) -> float:
+    """
+    :return: seconds per request
+    """
+    scope = {"type": "http", "method": "GET", "path": "/api/user/1", "headers": []}
+    start = time.perf_counter()
+    for _ in range(requests):
+        # START is changed in place when the middleware adds headers
+        START["headers"] = [(b"content-type", b"application/json")]
+        await application(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200000)
+    args = parser.parse_args()
+    # the middleware only imports the configuration, no database is needed
+    os.environ.setdefault("DB_CONNECTION", "postgresql://localhost/unused")
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    from app.core.config import DEBUG
+    from app.core.middlewares import MetricsMiddleware
+
+    instrumented = MetricsMiddleware(endpoint)
+    for _ in range(3):
+        bare = await time_requests(endpoint, args.requests)
+        with_middleware = await time_requests(instrumented, args.requests)
+        print(
+            f"DEBUG={DEBUG}  bare {bare * 1e6:6.2f} us  with MetricsMiddleware {with_middleware * 1e6:6.2f} us  "
+            f"overhead {(with_middleware - bare) * 1e6:6.2f} us per request"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
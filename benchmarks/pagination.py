@@ -0,0 +1,58 @@
+"""
+Pages through all users of /api/user/list with skip/limit and with the ``after`` cursor, one
+page at a time, and reports the total time and the time of the first and the last page.
+
+    python -m benchmarks.pagination --users 200000 --limit 100
+"""
+import asyncio
+import sys
+import time
+
+from benchmarks.common import argument_parser, configure, http_client, reset_database, seed_users
+
+
+async def page_through(client, limit: int, cursor: bool) -> tuple[int, list[float]]:
+    """
+    :param client:
+    :param limit: page size
+    :param cursor: page with ``after`` instead of ``skip``
+    :return: number of users seen and the time of every page
+    """
+    seen = 0
+    timings = []
+    after = ""
+    while True:
+        params = {"limit": limit, "after": after} if cursor else {"limit": limit, "skip": seen}
+        start = time.perf_counter()
+        response = await client.get("/api/user/list", params=params)
+        timings.append(time.perf_counter() - start)
+        response.raise_for_status()
+        body = response.json()
+        users = body["users"] if cursor else body
+        seen += len(users)
+        after = body["next_cursor"] if cursor else None
+        if not users or (cursor and after is None):
+            return seen, timings
+
+
+async def main() -> None:
+    parser = argument_parser(__doc__, load=False)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    configure()
+
+    if not args.keep_data:
+        reset_database()
+        seed_users(args.users)
+    async with http_client(args.url) as client:
+        for name, cursor in (("skip/limit", False), ("cursor", True)):
+            seen, timings = await page_through(client, args.limit, cursor)
+            print(
+                f"{name:10}  {seen} users in {len(timings)} pages  total {sum(timings):7.2f} s  "
+                f"first page {timings[0] * 1000:6.2f} ms  last page {timings[-1] * 1000:6.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,57 @@
+"""
+Hashes/sec per password hash scheme and cost on this machine, one hashing worker. Schemes whose
+backend is not installed (argon2 needs argon2-cffi) are reported as unavailable.
+
+    python -m benchmarks.password_hashing --seconds 2
+"""
+import argparse
+import os
+import sys
+import time
+
+COSTS = {
+    "bcrypt": (10, 11, 12, 13),
+    "argon2": (2, 3, 4),
+    "scrypt": (14, 15, 16),
+}
+
+
+def hashes_per_second(handler, seconds: float) -> float:
+    hashes = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds or not hashes:
+        handler.hash("benchmark password")
+        hashes += 1
+    return hashes / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=2, help="hashing time per scheme and cost")
+    args = parser.parse_args()
+    os.environ.setdefault("DB_CONNECTION", "postgresql://localhost/unused")
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    from passlib import hash as handlers
+    from passlib.exc import MissingBackendError
+
+    from app.core.config import ARGON2_MEMORY_COST, ARGON2_PARALLELISM, SCRYPT_BLOCK_SIZE, SCRYPT_PARALLELISM
+
+    # memory parameters as configured, the cost is varied
+    options = {
+        "bcrypt": {},
+        "argon2": {"memory_cost": ARGON2_MEMORY_COST, "parallelism": ARGON2_PARALLELISM},
+        "scrypt": {"block_size": SCRYPT_BLOCK_SIZE, "parallelism": SCRYPT_PARALLELISM},
+    }
+    for scheme, costs in COSTS.items():
+        for rounds in costs:
+            handler = getattr(handlers, scheme).using(rounds=rounds, **options[scheme])
+            try:
+                rate = hashes_per_second(handler, args.seconds)
+            except MissingBackendError:
+                print(f"{scheme:7} unavailable, backend not installed")
+                break
+            print(f"{scheme:7} rounds={rounds:<3} {rate:8.1f} hashes/s  {1000 / rate:8.1f} ms per hash")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+Load test of the database connection pool: database-bound GET /api/user/{user_id} requests at
+a concurrency above the pool size, then the pool statistics from /metrics. Timeouts must stay 0,
+the wait histogram shows how long requests queued for a connection.
+
+    python -m benchmarks.pool_load --concurrency 200 --requests 20000
+"""
+import asyncio
+import re
+import sys
+
+from benchmarks.common import (argument_parser, configure, existing_user_ids, http_client, reset_database, run_load,
+                               seed_users)
+
+POOL_METRICS = ("db_pool_timeouts_total", "db_pool_wait_seconds_count", "db_pool_wait_seconds_sum", "db_pool_size")
+
+
+async def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--users", type=int, default=10000)
+    args = parser.parse_args()
+    # every request reads from the database
+    configure(USER_CACHE_MAX_SIZE="1")
+
+    if args.keep_data:
+        ids = existing_user_ids()
+    else:
+        reset_database()
+        ids = seed_users(args.users)
+    async with http_client(args.url) as client:
+        result = await run_load(
+            lambda number: client.get(f"/api/user/{ids[number % len(ids)]}"), args.requests, args.concurrency
+        )
+        exposition = (await client.get("/metrics")).text
+    print(f"GET /api/user/{{user_id}}  concurrency {args.concurrency}  {result}")
+    for name in POOL_METRICS:
+        match = re.search(rf"^{name} (\S+)$", exposition, re.MULTILINE)
+        # counters without samples have no line yet
+        print(f"{name:28} {match.group(1) if match else 0}")
+    waits = re.findall(r'^db_pool_wait_seconds_bucket\{le="([^"]+)"\} (\S+)$', exposition, re.MULTILINE)
+    print("db_pool_wait_seconds         " + "  ".join(f"<={bound}: {count}" for bound, count in waits))
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
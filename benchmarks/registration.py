@@ -0,0 +1,63 @@
+"""
+Users/sec of POST /api/user/register at a given concurrency against POST /api/user/register/batch
+sent one batch at a time, and the latency of a login while a batch is being hashed.
+
+    python -m benchmarks.registration --users 2000 --batch-size 500 --concurrency 20
+
+Hashing dominates at the default bcrypt cost, BCRYPT_ROUNDS=4 shows the cost of the rest.
+"""
+import asyncio
+import sys
+import time
+import uuid
+
+from benchmarks.common import argument_parser, configure, http_client, reset_database, run_load
+
+
+def user_body(username: str) -> dict:
+    return {"username": username, "first_name": "First", "email": f"{username}@example.com", "password": "password"}
+
+
+async def main() -> None:
+    parser = argument_parser(__doc__, load=False)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    configure(LOGIN_THROTTLE_USERNAME_LIMIT="0", LOGIN_THROTTLE_IP_LIMIT="0")
+
+    if not args.keep_data:
+        reset_database()
+    # usernames of earlier runs stay taken with --keep-data
+    run = uuid.uuid4().hex[:8]
+    async with http_client(args.url) as client:
+        single = await run_load(
+            lambda number: client.post("/api/user/register", json=user_body(f"single-{run}-{number}")),
+            args.users, args.concurrency,
+        )
+        print(f"register        {single.requests_per_second:9.0f} users/s  {single}")
+
+        start = time.perf_counter()
+        for offset in range(0, args.users, args.batch_size):
+            bodies = [user_body(f"batch-{run}-{number}") for number in range(offset, offset + args.batch_size)]
+            response = await client.post("/api/user/register/batch", json=bodies)
+            response.raise_for_status()
+        seconds = time.perf_counter() - start
+        print(f"register/batch  {args.users / seconds:9.0f} users/s  batches of {args.batch_size}")
+
+        login = {"username": f"single-{run}-0", "password": "password"}
+        start = time.perf_counter()
+        (await client.post("/api/auth/login", json=login)).raise_for_status()
+        idle = time.perf_counter() - start
+        bodies = [user_body(f"during-{run}-{number}") for number in range(args.batch_size)]
+        batch = asyncio.create_task(client.post("/api/user/register/batch", json=bodies))
+        await asyncio.sleep(0.3)
+        start = time.perf_counter()
+        (await client.post("/api/auth/login", json=login)).raise_for_status()
+        busy = time.perf_counter() - start
+        (await batch).raise_for_status()
+        print(f"login           idle {idle * 1000:7.1f} ms  during a batch {busy * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,79 @@
+"""
+Serialization time of user responses: pages of users the way FastAPI's response_model does it
+(validation from attributes, jsonable_encoder, JSONResponse) against UserResponse.from_row and
+TypeAdapter.dump_json, and the /auth/me body parsed from the cached snapshot and dumped again
+against the snapshot served as it is. No database is needed.
+
+    python -m benchmarks.serialization --sizes 100 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+
+def make_rows(count: int) -> list[SimpleNamespace]:
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        SimpleNamespace(
+            id=number, username=f"user{number}", first_name="First", last_name="Last",
+            email=f"user{number}@example.com", is_active=True, created_at=created_at, updated_at=None,
+            role=[SimpleNamespace(name="admin", description=None)],
+        )
+        for number in range(count)
+    ]
+
+
+def seconds_per_call(func, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], help="users per page")
+    parser.add_argument("--users", type=int, default=20000, help="users serialized per page size")
+    args = parser.parse_args()
+    os.environ.setdefault("DB_CONNECTION", "postgresql://localhost/unused")
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    from app.schemas.users import UserResponse, user_list_adapter, user_response_adapter
+
+    field = create_response_field(name="response", type_=list[UserResponse])
+    loop = asyncio.new_event_loop()
+
+    def response_model(rows: list) -> bytes:
+        content = loop.run_until_complete(serialize_response(field=field, response_content=rows, is_coroutine=True))
+        return JSONResponse(content).body
+
+    def from_rows(rows: list) -> bytes:
+        return user_list_adapter.dump_json([UserResponse.from_row(row) for row in rows])
+
+    for size in args.sizes:
+        rows = make_rows(size)
+        assert json.loads(response_model(rows)) == json.loads(from_rows(rows))
+        calls = max(args.users // size, 1)
+        default = seconds_per_call(lambda: response_model(rows), calls)
+        fast = seconds_per_call(lambda: from_rows(rows), calls)
+        print(f"page of {size:5}  response_model {default * 1e3:8.2f} ms  dump_json {fast * 1e3:8.2f} ms  "
+              f"x{default / fast:.1f}")
+
+    snapshot = user_response_adapter.dump_json(UserResponse.from_row(make_rows(1)[0]))
+    parsed = seconds_per_call(lambda: user_response_adapter.dump_json(user_response_adapter.validate_json(snapshot)),
+                              args.users)
+    print(f"/auth/me body  validate_json and dump_json of the snapshot {parsed * 1e6:8.2f} us, "
+          f"skipped when it is served as it is")
+    loop.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""
+Requests/sec of GET /api/user/{user_id} at a given concurrency. The ids cycle through the seeded
+users; with ``--cold`` the user cache keeps a single entry so nearly every request reads from the
+database and the numbers show the async data layer and its connection pool rather than the cache.
+
+    python -m benchmarks.user_retrieve --users 10000 --requests 20000 --concurrency 100 --cold
+"""
+import asyncio
+import sys
+
+from benchmarks.common import (argument_parser, configure, existing_user_ids, http_client, reset_database, run_load,
+                               seed_users)
+
+
+async def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--cold", action="store_true", help="bypass the user cache")
+    args = parser.parse_args()
+    configure(**({"USER_CACHE_MAX_SIZE": "1"} if args.cold else {}))
+
+    if args.keep_data:
+        ids = existing_user_ids()
+    else:
+        reset_database()
+        ids = seed_users(args.users)
+    async with http_client(args.url) as client:
+        result = await run_load(
+            lambda number: client.get(f"/api/user/{ids[number % len(ids)]}"), args.requests, args.concurrency
+        )
+    print(f"GET /api/user/{{user_id}}  concurrency {args.concurrency}  {result}")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
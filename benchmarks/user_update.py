@@ -0,0 +1,34 @@
+"""
+Write throughput of PUT /api/user/{user_id}, every request changes first_name of one of the
+seeded users, spread over them so concurrent requests rarely wait for the same row lock.
+
+    python -m benchmarks.user_update --users 10000 --requests 20000 --concurrency 50
+"""
+import asyncio
+import sys
+
+from benchmarks.common import (argument_parser, configure, existing_user_ids, http_client, reset_database, run_load,
+                               seed_users)
+
+
+async def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--users", type=int, default=10000)
+    args = parser.parse_args()
+    configure()
+
+    if args.keep_data:
+        ids = existing_user_ids()
+    else:
+        reset_database()
+        ids = seed_users(args.users)
+    async with http_client(args.url) as client:
+        result = await run_load(
+            lambda number: client.put(f"/api/user/{ids[number % len(ids)]}", json={"first_name": f"First{number}"}),
+            args.requests, args.concurrency,
+        )
+    print(f"PUT /api/user/{{user_id}}  concurrency {args.concurrency}  {result}")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
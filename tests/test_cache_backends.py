@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from app.utils.cache_backends import RedisCacheBackend
+
+
+async def read_command(reader: asyncio.StreamReader) -> list[bytes]:
+    count = int((await reader.readline())[1:])
+    command = []
+    for _ in range(count):
+        length = int((await reader.readline())[1:])
+        command.append((await reader.readexactly(length + 2))[:-2])
+    return command
+
+
+async def serve(handle, credentials: str = "", db: int = 0) -> tuple[asyncio.AbstractServer, str]:
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    return server, f"redis://{credentials}{host}:{port}/{db}"
+
+
+def test_commands_run_concurrently():
+    async def slow_redis(reader, writer):
+        try:
+            while True:
+                await read_command(reader)
+                await asyncio.sleep(0.2)
+                writer.write(b"$-1\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ValueError):
+            writer.close()
+
+    async def main():
+        server, url = await serve(slow_redis)
+        backend = RedisCacheBackend(url, prefix="test:", pool_size=8)
+        start_time = time.perf_counter()
+        values = await asyncio.gather(*(backend.get(f"key{index}") for index in range(8)))
+        elapsed = time.perf_counter() - start_time
+        await backend.close()
+        server.close()
+        return values, elapsed
+
+    values, elapsed = asyncio.run(main())
+    assert values == [None] * 8
+    # one round-trip at a time would take 8 * 0.2 seconds
+    assert elapsed < 0.8
+
+
+def test_unresponsive_redis_fails_fast():
+    async def unresponsive_redis(reader, writer):
+        await reader.read()
+
+    async def main():
+        # AUTH and SELECT are sent on connect, they time out as well
+        server, url = await serve(unresponsive_redis, credentials=":secret@", db=1)
+        backend = RedisCacheBackend(url, prefix="test:", timeout=0.2, pool_size=4)
+        start_time = time.perf_counter()
+        values = await asyncio.gather(*(backend.get(f"key{index}") for index in range(40)))
+        elapsed = time.perf_counter() - start_time
+        errors = backend.errors
+        # no new attempts while backing off
+        await backend.get("key")
+        await backend.close()
+        server.close()
+        return values, elapsed, errors, backend.errors
+
+    values, elapsed, errors, errors_after = asyncio.run(asyncio.wait_for(main(), 5))
+    assert values == [None] * 40
+    assert errors == 40 and errors_after == 41
+    # waiting for a timeout per command would take 40 / 4 * 0.2 seconds
+    assert elapsed < 0.8
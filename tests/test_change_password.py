@@ -0,0 +1,72 @@
+from sqlalchemy import update
+
+from app.db.database import engine
+from app.db.models.users import User
+from app.services import security
+from app.services import users as users_service
+from app.utils import constants as const
+from tests.utils import login, register
+
+
+def change_password(client, headers: dict, current_password: str, new_password: str = "changed"):
+    return client.put("/api/auth/role/change_password", headers=headers, json={
+        "current_password": current_password, "new_password": new_password, "confirm_password": new_password,
+    })
+
+
+def test_change_password(client):
+    register(client, "alice")
+    headers = login(client, "alice")
+
+    response = change_password(client, headers, "password")
+    assert response.status_code == 200, response.text
+    login(client, "alice", "changed")
+    assert client.post("/api/auth/login", json={"username": "alice", "password": "password"}).status_code == 400
+
+
+def test_wrong_current_password(client):
+    register(client, "alice")
+    headers = login(client, "alice")
+
+    response = change_password(client, headers, "wrong")
+    assert response.status_code == 400
+    assert response.json()["detail"] == const.INCORRECT_PASSWORD
+
+
+def test_hash_replaced_while_changing_password(client, monkeypatch):
+    user = register(client, "alice")
+    headers = login(client, "alice")
+    aget_password_hash = users_service.aget_password_hash
+
+    async def rehash_first(password: str) -> str:
+        # the background rehash of a login stores a new hash of the same password
+        with engine.begin() as connection:
+            connection.execute(
+                update(User).where(User.id == user["id"]).values(password=security.get_password_hash("password"))
+            )
+        monkeypatch.setattr(users_service, "aget_password_hash", aget_password_hash)
+        return await aget_password_hash(password)
+
+    monkeypatch.setattr(users_service, "aget_password_hash", rehash_first)
+    response = change_password(client, headers, "password")
+    assert response.status_code == 200, response.text
+    login(client, "alice", "changed")
+
+
+def test_password_changed_concurrently(client, monkeypatch):
+    user = register(client, "alice")
+    headers = login(client, "alice")
+    aget_password_hash = users_service.aget_password_hash
+
+    async def change_first(password: str) -> str:
+        with engine.begin() as connection:
+            connection.execute(
+                update(User).where(User.id == user["id"]).values(password=security.get_password_hash("other"))
+            )
+        return await aget_password_hash(password)
+
+    monkeypatch.setattr(users_service, "aget_password_hash", change_first)
+    response = change_password(client, headers, "password")
+    assert response.status_code == 400
+    assert response.json()["detail"] == const.INCORRECT_PASSWORD
+    login(client, "alice", "other")
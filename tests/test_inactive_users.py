@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from app.utils import constants as const
+from tests.utils import login, register
+
+
+@pytest.fixture
+def deleted_user(client) -> dict:
+    register(client, "active")
+    user = register(client, "deleted")
+    assert client.delete(f"/api/user/{user['id']}").status_code == 200
+    return user
+
+
+def test_list_skips_inactive_users(client, deleted_user):
+    assert [user["username"] for user in client.get("/api/user/list").json()] == ["active"]
+    response = client.get("/api/user/list", params={"include_inactive": True})
+    assert [user["username"] for user in response.json()] == ["active", "deleted"]
+
+
+def test_retrieve_of_inactive_user_fails(client, deleted_user):
+    assert client.get(f"/api/user/{deleted_user['id']}").status_code == 400
+
+
+@pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+def test_export_skips_inactive_users(client, deleted_user, export_format):
+    response = client.get("/api/user/export", params={"format": export_format})
+    assert response.status_code == 200
+    assert "active" in response.text
+    assert "deleted" not in response.text
+
+    response = client.get("/api/user/export", params={"format": export_format, "include_inactive": True})
+    assert "deleted" in response.text
+
+
+def test_ndjson_export_keeps_datetime_format(client, deleted_user):
+    response = client.get("/api/user/export")
+    user = json.loads(response.text.splitlines()[0])
+    assert user["created_at"].endswith("Z")
+    assert user["role"] == []
+
+
+def test_email_change_of_deleted_user_fails(client):
+    user = register(client, "alice")
+    headers = login(client, "alice")
+    assert client.put("/api/email/input", params={"email": "new@example.com"}, headers=headers).status_code == 200
+    assert client.get(f"/api/user/{user['id']}").json()["email"] == "new@example.com"
+    assert client.delete(f"/api/user/{user['id']}").status_code == 200
+
+    response = client.put("/api/email/input", params={"email": "other@example.com"}, headers=headers)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == const.USER_NOT_FOUND
+
+
+def test_deleted_user_loses_access(client):
+    user = register(client, "alice")
+    headers = login(client, "alice")
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+    assert client.delete(f"/api/user/{user['id']}").status_code == 200
+
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+    response = client.put("/api/auth/role/change_password", headers=headers, json={
+        "current_password": "password", "new_password": "changed", "confirm_password": "changed",
+    })
+    assert response.status_code == 401
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.services import security
+from app.services.throttling import login_throttle
+from app.utils import constants as const
+from app.utils.rate_limit import MemoryRateLimitBackend
+from tests.utils import login, query_count, register
+
+
+def attempt(client, username: str, password: str = "wrong"):
+    return client.post("/api/auth/login", json={"username": username, "password": password})
+
+
+@pytest.fixture
+def password_checks(monkeypatch) -> list[str]:
+    checks = []
+
+    async def verify(plain_password: str, hashed_password: str) -> bool:
+        checks.append("verify")
+        return security.verify_password(plain_password, hashed_password)
+
+    async def dummy_verify() -> bool:
+        checks.append("dummy")
+        return False
+
+    monkeypatch.setattr(security, "averify_password", verify)
+    monkeypatch.setattr(security, "adummy_verify", dummy_verify)
+    return checks
+
+
+def test_throttled_login_skips_database_and_hashing(client, password_checks):
+    register(client, "alice")
+    for _ in range(login_throttle.username_limit):
+        assert attempt(client, "alice").status_code == 400
+    assert password_checks
+    password_checks.clear()
+
+    response = attempt(client, "alice", "password")
+
+    assert response.status_code == 429
+    assert response.json()["detail"] == const.TOO_MANY_LOGIN_ATTEMPTS
+    assert response.headers["Retry-After"]
+    assert query_count(response) == 0
+    assert password_checks == []
+
+
+def test_username_limit_ignores_case(client):
+    register(client, "alice")
+    for number in range(login_throttle.username_limit):
+        assert attempt(client, "ALICE" if number % 2 else "Alice").status_code == 400
+
+    assert attempt(client, "alice").status_code == 429
+
+
+def test_successful_login_resets_username_limit(client):
+    register(client, "alice")
+    for _ in range(login_throttle.username_limit - 1):
+        assert attempt(client, "alice").status_code == 400
+    login(client, "alice")
+
+    for _ in range(login_throttle.username_limit):
+        assert attempt(client, "alice").status_code == 400
+    assert attempt(client, "alice").status_code == 429
+
+
+def test_prune_keeps_keys_under_attack():
+    backend = MemoryRateLimitBackend(max_keys=100)
+
+    async def spray() -> float:
+        for _ in range(5):
+            await backend.hit("target", window=60)
+        for number in range(1000):
+            await backend.hit(f"sprayed-{number}", window=60)
+        return await backend.hit("target", window=60)
+
+    assert asyncio.run(spray()) == 6
+    assert len(backend) <= 100
+    # the newest sprayed key is counted as well
+    assert asyncio.run(backend.hit("sprayed-999", window=60)) == 2
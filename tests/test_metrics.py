@@ -0,0 +1,35 @@
+import re
+
+from app.core.metrics import Histogram, REGISTRY
+from tests.utils import register
+
+
+def sample(client, line: str) -> float:
+    match = re.search(rf"^{re.escape(line)} (\S+)$", client.get("/metrics").text, re.MULTILINE)
+    return float(match.group(1)) if match else 0
+
+
+def test_histogram_child_shares_values():
+    histogram = Histogram("test_child_seconds", "Histogram of the test", labelnames=("route",), buckets=(1, 2))
+    REGISTRY.remove(histogram)
+
+    histogram.labels("a").observe(0.5)
+    histogram.observe(1.5, "a")
+    histogram.labels("b").observe(3)
+
+    assert histogram.collect() == {
+        ("a",): {"buckets": {1: 1, 2: 2, float("inf"): 2}, "count": 2, "sum": 2.0},
+        ("b",): {"buckets": {1: 0, 2: 0, float("inf"): 1}, "count": 1, "sum": 3},
+    }
+
+
+def test_requests_are_recorded_per_route(client):
+    requests = 'http_requests_total{route="auth:register",method="POST",status="201"}'
+    durations = 'http_request_duration_seconds_count{route="auth:register"}'
+    queries = 'db_queries_per_request_count{route="auth:register"}'
+    before = [sample(client, line) for line in (requests, durations, queries)]
+
+    register(client, "alice")
+    register(client, "bob")
+
+    assert [sample(client, line) for line in (requests, durations, queries)] == [count + 2 for count in before]
@@ -0,0 +1,115 @@
+import pytest
+
+from tests.utils import login, query_count, register
+
+
+@pytest.fixture
+def users(client):
+    users = []
+    for index in range(30):
+        user = register(client, f"user{index}")
+        response = client.post(f"/api/auth/role/{user['id']}/create", json={"name": "admin"})
+        assert response.status_code == 200, response.text
+        users.append(user)
+    return users
+
+
+def test_user_list_query_count_does_not_depend_on_page_size(client, users):
+    counts = set()
+    for limit in (1, 10, 30):
+        response = client.get("/api/user/list", params={"limit": limit})
+        assert response.status_code == 200
+        assert len(response.json()) == limit
+        assert all(user["role"] for user in response.json())
+        counts.add(query_count(response))
+    # users and their roles
+    assert counts == {2}
+
+
+def test_user_page_query_count_does_not_depend_on_page_size(client, users):
+    counts = set()
+    for limit in (1, 10, 30):
+        response = client.get("/api/user/list", params={"limit": limit, "after": ""})
+        assert response.status_code == 200
+        assert len(response.json()["users"]) == limit
+        counts.add(query_count(response))
+    assert counts == {2}
+
+
+def test_user_retrieve_loads_roles_in_one_query(client, users):
+    response = client.get(f"/api/user/{users[0]['id']}")
+    assert response.json()["role"] == [{"name": "admin", "description": None}]
+    assert query_count(response) == 1
+    # served from the user cache afterwards
+    assert query_count(client.get(f"/api/user/{users[0]['id']}")) == 0
+
+
+def test_user_update_is_one_statement(client, users):
+    response = client.put(f"/api/user/{users[0]['id']}", json={"last_name": "Last", "email": "new@example.com"})
+    assert response.status_code == 200, response.text
+    assert response.json()["role"] == [{"name": "admin", "description": None}]
+    # UPDATE ... RETURNING joined with the roles
+    assert query_count(response) == 1
+
+
+def test_password_update_revokes_refresh_tokens(client, users):
+    response = client.put(f"/api/user/{users[0]['id']}", json={"password": "new-password"})
+    assert response.status_code == 200, response.text
+    assert query_count(response) == 2
+
+
+def test_user_delete_query_count(client, users):
+    response = client.delete(f"/api/user/{users[0]['id']}")
+    assert response.status_code == 200, response.text
+    # soft delete and revocation of refresh tokens
+    assert query_count(response) == 2
+
+
+def test_register_is_one_statement(client):
+    response = client.post("/api/user/register", json={
+        "username": "alice", "first_name": "Alice", "email": "alice@example.com", "password": "password",
+    })
+    assert response.status_code == 201, response.text
+    # INSERT ... ON CONFLICT DO NOTHING RETURNING
+    assert query_count(response) == 1
+
+
+def test_register_batch_query_count_does_not_depend_on_batch_size(client):
+    counts = set()
+    for size in (1, 10, 50):
+        response = client.post("/api/user/register/batch", json=[
+            {"username": f"batch{size}-{index}", "first_name": "First", "email": "user@example.com",
+             "password": "password"}
+            for index in range(size)
+        ])
+        assert response.json()["created"] == size
+        counts.add(query_count(response))
+    # taken usernames and the multi-row INSERT
+    assert counts == {2}
+
+
+def test_change_password_query_count(client, users):
+    headers = login(client, "user0")
+    response = client.put("/api/auth/role/change_password", headers=headers, json={
+        "current_password": "password", "new_password": "changed", "confirm_password": "changed",
+    })
+    assert response.status_code == 200, response.text
+    # read, conditional UPDATE, refresh token revocation and the new token pair
+    assert query_count(response) == 6
+
+
+def test_profile_is_served_from_user_snapshot(client, users, monkeypatch):
+    from app.services.users import UsersService
+
+    async def parse_snapshot(*args, **kwargs):
+        raise AssertionError("snapshot parsed")
+
+    monkeypatch.setattr(UsersService, "get_user_snapshot", parse_snapshot)
+    headers = login(client, "user0")
+    response = client.get("/api/auth/me", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["username"] == "user0"
+    assert response.json()["role"] == [{"name": "admin", "description": None}]
+    assert response.content == client.get(f"/api/user/{users[0]['id']}").content
+    # served from the user cache afterwards
+    assert query_count(client.get("/api/auth/me", headers=headers)) == 0
@@ -0,0 +1,81 @@
+import re
+
+import pytest
+from sqlalchemy import event
+
+from app.db.database import AsyncSessionLocal, async_engine, engine
+from app.services.users import UsersService, rehash_password
+from tests.utils import login, register
+
+USERS_TABLE = re.compile(r"\busers\b")
+
+
+@pytest.fixture
+def statements(client):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if USERS_TABLE.search(statement) and statement.lstrip().upper().startswith(
+                ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+
+def run_service(client, method: str, *args):
+    async def call():
+        async with AsyncSessionLocal() as db:
+            return await getattr(UsersService(db), method)(*args)
+
+    return client.portal.call(call)
+
+
+def use_every_users_query(client) -> None:
+    alice = register(client, "alice")
+    register(client, "bob")
+    carol = register(client, "carol")
+    client.post("/api/user/register", json={"username": "ALICE", "first_name": "A", "email": "a@example.com",
+                                            "password": "password"})
+    client.post("/api/user/register/batch", json=[
+        {"username": "dave", "first_name": "D", "email": "d@example.com", "password": "password"},
+        {"username": "Bob", "first_name": "B", "email": "b@example.com", "password": "password"},
+    ])
+    client.post(f"/api/auth/role/{alice['id']}/create", json={"name": "admin"})
+    headers = login(client, "Alice")
+    client.post("/api/auth/login", json={"username": "nobody", "password": "password"})
+    client.post("/api/auth/token", data={"username": "bob", "password": "password"})
+    client.get("/api/auth/me", headers=headers)
+    client.get("/api/user/list")
+    client.get("/api/user/list", params={"after": "", "limit": 2})
+    client.get("/api/user/list", params={"include_inactive": True})
+    client.get("/api/user/export")
+    client.get(f"/api/user/{carol['id']}")
+    client.put(f"/api/user/{carol['id']}", json={"last_name": "Last", "password": "new-password"})
+    client.put(f"/api/user/{carol['id']}", json={"username": "BOB"})
+    client.put("/api/email/input", params={"email": "alice@example.org"}, headers=headers)
+    client.put("/api/auth/role/change_password", headers=headers, json={
+        "current_password": "password", "new_password": "changed", "confirm_password": "changed",
+    })
+    client.delete(f"/api/user/{carol['id']}")
+    run_service(client, "get_all_users")
+    run_service(client, "check_user_attrs", alice["id"])
+    user = run_service(client, "get_user_by_username", "bob")
+    client.portal.call(rehash_password, user.id, user.password, "password")
+
+
+def test_users_queries_use_indexes(client, statements):
+    use_every_users_query(client)
+    assert len(statements) > 20
+
+    seq_scans = []
+    with engine.begin() as connection:
+        # a seq scan is then only planned when no index can serve the query
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        for statement, parameters in statements:
+            plan = "\n".join(row[0] for row in connection.exec_driver_sql("EXPLAIN " + statement, parameters))
+            if "Seq Scan on users" in plan:
+                seq_scans.append(f"{statement}\n{plan}")
+
+    assert not seq_scans, "\n\n".join(seq_scans)
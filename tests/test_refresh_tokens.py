@@ -0,0 +1,53 @@
+from app.utils import constants as const
+from tests.utils import register
+
+
+def log_in(client, username: str) -> dict:
+    response = client.post("/api/auth/login", json={"username": username, "password": "password"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def refresh(client, refresh_token: str):
+    return client.post("/api/auth/refresh", json={"refresh_token": refresh_token})
+
+
+def test_refresh_rotates_token(client):
+    register(client, "alice")
+    tokens = log_in(client, "alice")
+
+    response = refresh(client, tokens["refresh_token"])
+    assert response.status_code == 200, response.text
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+
+    profile = client.get("/api/auth/me", headers={"Authorization": f"Bearer {rotated['access_token']}"})
+    assert profile.json()["username"] == "alice"
+    assert refresh(client, rotated["refresh_token"]).status_code == 200
+
+
+def test_reuse_of_rotated_token_revokes_family(client):
+    register(client, "alice")
+    tokens = log_in(client, "alice")
+    rotated = refresh(client, tokens["refresh_token"]).json()
+    other_login = log_in(client, "alice")
+
+    response = refresh(client, tokens["refresh_token"])
+    assert response.status_code == 401
+    assert response.json()["detail"] == const.INVALID_REFRESH_TOKEN
+    # the token rotated from the reused one belongs to the revoked family
+    assert refresh(client, rotated["refresh_token"]).status_code == 401
+    # other logins are separate families
+    assert refresh(client, other_login["refresh_token"]).status_code == 200
+
+
+def test_unknown_token_is_refused(client):
+    assert refresh(client, "unknown").status_code == 401
+
+
+def test_refresh_refused_after_user_is_deleted(client):
+    user = register(client, "alice")
+    tokens = log_in(client, "alice")
+    assert client.delete(f"/api/user/{user['id']}").status_code == 200
+
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
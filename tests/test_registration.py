@@ -0,0 +1,46 @@
+import asyncio
+
+import httpx
+
+from app.utils import constants as const
+from tests.utils import register
+
+
+def post_concurrently(client, path: str, bodies: list[dict]) -> list[httpx.Response]:
+    async def post_all():
+        async with httpx.AsyncClient(app=client.app, base_url="http://test") as async_client:
+            return await asyncio.gather(*(async_client.post(path, json=body) for body in bodies))
+
+    return client.portal.call(post_all)
+
+
+def user_body(username: str) -> dict:
+    return {"username": username, "first_name": "First", "email": "user@example.com", "password": "password"}
+
+
+def test_concurrent_registrations_of_one_username(client):
+    responses = post_concurrently(client, "/api/user/register", [user_body("alice") for _ in range(20)])
+
+    assert sorted(response.status_code for response in responses) == [201] + [400] * 19
+    conflicts = [response for response in responses if response.status_code == 400]
+    assert all(response.json()["detail"] == const.USERNAME_TAKEN for response in conflicts)
+    assert len(client.get("/api/user/list").json()) == 1
+
+
+def test_concurrent_registrations_differing_in_case(client):
+    usernames = ["bob", "Bob", "BOB", "bOb", "boB"] * 4
+    responses = post_concurrently(client, "/api/user/register", [user_body(username) for username in usernames])
+
+    assert sorted(response.status_code for response in responses) == [201] + [400] * 19
+
+
+def test_update_to_taken_username(client):
+    register(client, "carol")
+    user = register(client, "dave")
+
+    response = client.put(f"/api/user/{user['id']}", json={"username": "CAROL"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == const.USERNAME_TAKEN
+
+    response = client.put(f"/api/user/{user['id']}", json={"username": "dave", "first_name": "Dave"})
+    assert response.status_code == 200, response.text
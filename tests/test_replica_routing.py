@@ -0,0 +1,133 @@
+"""
+Routing tests need two more throwaway databases standing in for read replicas, they are not
+replicated, every test fills them on its own:
+
+    TEST_DB_REPLICA_CONNECTIONS=postgresql://.../auth_replica1,postgresql://.../auth_replica2
+"""
+import os
+
+import pytest
+from databases import DatabaseURL
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.database import AsyncSessionLocal, Base, replicas
+from app.services import users as users_service
+from tests.utils import login, register
+
+TEST_DB_REPLICA_CONNECTIONS = [url for url in os.environ.get("TEST_DB_REPLICA_CONNECTIONS", "").split(",") if url]
+
+
+@pytest.fixture
+def stand_in_replicas(monkeypatch) -> list[str]:
+    if len(TEST_DB_REPLICA_CONNECTIONS) < 2:
+        pytest.skip("TEST_DB_REPLICA_CONNECTIONS needs two databases")
+    for url in TEST_DB_REPLICA_CONNECTIONS:
+        engine = create_engine(url)
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        engine.dispose()
+    engines = [
+        create_async_engine(str(DatabaseURL(url).replace(driver="asyncpg")))
+        for url in TEST_DB_REPLICA_CONNECTIONS
+    ]
+    # the application checks their health on startup and disposes them on shutdown
+    monkeypatch.setattr(replicas, "engines", engines)
+    monkeypatch.setattr(replicas, "healthy", list(engines))
+    return TEST_DB_REPLICA_CONNECTIONS
+
+
+@pytest.fixture
+def client(stand_in_replicas, client):
+    return client
+
+
+def insert_user(url: str, user_id: int, username: str, first_name: str) -> None:
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO users (id, username, first_name, email, password, is_active, created_at, updated_at) "
+                "VALUES (:id, :username, :first_name, 'replica@example.com', 'x', true, now(), now())"
+            ),
+            {"id": user_id, "username": username, "first_name": first_name},
+        )
+    engine.dispose()
+
+
+def forget_writes() -> None:
+    # as seen by a worker other than the one that made the writes
+    users_service.user_cache.clear()
+    users_service.recent_writes.clear()
+
+
+def test_reads_are_spread_over_replicas(client, stand_in_replicas):
+    for index, url in enumerate(stand_in_replicas):
+        insert_user(url, 1, "alice", f"replica{index}")
+
+    first_names = {client.get("/api/user/list").json()[0]["first_name"] for _ in range(4)}
+    assert first_names == {"replica0", "replica1"}
+
+
+def test_reads_after_write_go_to_primary(client, stand_in_replicas):
+    for index, url in enumerate(stand_in_replicas):
+        insert_user(url, 1, "alice", f"replica{index}")
+    user = register(client, "alice", first_name="primary")
+
+    assert client.get(f"/api/user/{user['id']}").json()["first_name"] == "primary"
+    forget_writes()
+    assert client.get(f"/api/user/{user['id']}").json()["first_name"].startswith("replica")
+
+
+def test_write_reads_primary(client, stand_in_replicas):
+    for index, url in enumerate(stand_in_replicas):
+        insert_user(url, 1, "alice", f"replica{index}")
+    user = register(client, "alice", first_name="primary")
+    forget_writes()
+
+    response = client.put(f"/api/user/{user['id']}", json={"last_name": "Last"})
+    assert response.status_code == 200, response.text
+    assert response.json()["first_name"] == "primary"
+
+
+def test_unhealthy_replicas_are_skipped(client, stand_in_replicas):
+    insert_user(stand_in_replicas[0], 1, "alice", "replica0")
+    insert_user(stand_in_replicas[1], 1, "alice", "replica1")
+    user = register(client, "alice", first_name="primary")
+    forget_writes()
+
+    replicas.healthy = [replicas.engines[1]]
+    assert client.get(f"/api/user/{user['id']}").json()["first_name"] == "replica1"
+    replicas.healthy = []
+    users_service.user_cache.clear()
+    assert client.get(f"/api/user/{user['id']}").json()["first_name"] == "primary"
+
+
+def test_login_is_not_rejected_by_lagging_replica(client):
+    register(client, "bob")
+    forget_writes()
+
+    login(client, "bob")
+    assert client.portal.call(users_service.unknown_usernames.get, "bob") is None
+
+
+def test_relationship_loads_follow_primary_read(client, stand_in_replicas):
+    user = register(client, "alice")
+    for url in stand_in_replicas:
+        insert_user(url, user["id"], "alice", "replica")
+        engine = create_engine(url)
+        with engine.begin() as connection:
+            connection.execute(
+                text("INSERT INTO user_roles (name, user_id) VALUES ('replica-role', :user_id)"),
+                {"user_id": user["id"]},
+            )
+        engine.dispose()
+    forget_writes()
+
+    async def all_users() -> list[tuple]:
+        async with AsyncSessionLocal() as db:
+            users = await users_service.UsersService(db).get_all_users()
+            return [(user.first_name, [role.name for role in user.role]) for user in users]
+
+    # get_all_users reads from the primary, so do the roles loaded for it; alice has none there
+    assert client.portal.call(all_users) == [("First", [])]
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.db.database import AsyncSessionLocal
+from app.db.models.tokens import RevokedToken
+from app.services import revocation
+from app.services.revocation import RevocationService
+
+
+def run(client, func, *args):
+    async def with_service():
+        async with AsyncSessionLocal() as db:
+            return await func(RevocationService(db), *args)
+
+    return client.portal.call(with_service)
+
+
+async def revoke(service: RevocationService, jti: str, expires_in: timedelta = timedelta(minutes=5)) -> None:
+    await service.revoke(jti, None, datetime.now(timezone.utc) + expires_in)
+
+
+async def sync(service: RevocationService) -> int:
+    return await service.sync_filter()
+
+
+def test_local_revocation_is_counted_once(client):
+    run(client, revoke, "jti-1")
+    run(client, sync)
+
+    assert "jti-1" in revocation.revocation_filter
+    assert revocation.revocation_filter.count == 1
+
+
+def test_full_filter_is_rebuilt_from_unexpired_jtis(client):
+    run(client, revoke, "expired", timedelta(minutes=-5))
+    run(client, revoke, "valid")
+    revocation.revocation_filter.count = revocation.revocation_filter.capacity
+
+    run(client, sync)
+
+    assert "valid" in revocation.revocation_filter
+    assert revocation.revocation_filter.count == 1
+
+
+def test_failed_rebuild_keeps_filter(client, monkeypatch):
+    run(client, revoke, "jti-1")
+    full_filter = revocation.revocation_filter
+    full_filter.count = full_filter.capacity
+
+    async def fail(*args, **kwargs):
+        raise ConnectionError("database is gone")
+
+    monkeypatch.setattr("sqlalchemy.ext.asyncio.AsyncSession.execute", fail)
+    with pytest.raises(ConnectionError):
+        run(client, sync)
+
+    assert revocation.revocation_filter is full_filter
+    assert "jti-1" in revocation.revocation_filter
+
+
+def test_revocation_committed_out_of_order_is_synced(client):
+    def values(jti: str) -> dict:
+        return {"jti": jti, "expires_at": datetime.now(timezone.utc) + timedelta(minutes=5)}
+
+    run(client, revoke, "earlier")
+    run(client, sync)
+
+    async def scenario():
+        async with AsyncSessionLocal() as slow, AsyncSessionLocal() as fast, AsyncSessionLocal() as db:
+            # the slow insert takes the lower id but commits after the fast one
+            await slow.execute(insert(RevokedToken).values(values("slow")))
+            await fast.execute(insert(RevokedToken).values(values("fast")))
+            await fast.commit()
+            assert await RevocationService(db).sync_filter() == 1
+            await db.commit()
+            assert "fast" in revocation.revocation_filter
+            assert "slow" not in revocation.revocation_filter
+
+            await slow.commit()
+            assert await RevocationService(db).sync_filter() == 1
+            await db.commit()
+            assert "slow" in revocation.revocation_filter
+            assert not revocation._missing_ids
+            assert await RevocationService(db).sync_filter() == 0
+
+    client.portal.call(scenario)
+
+
+def test_skipped_ids_are_given_up_after_timeout(client):
+    run(client, revoke, "jti-1")
+    run(client, sync)
+    revocation._missing_ids[revocation._last_synced_id + 5] = 0
+    run(client, revoke, "jti-2")
+
+    run(client, sync)
+
+    assert "jti-2" in revocation.revocation_filter
+    assert list(revocation._missing_ids) == []
+
+
+def test_purge_deletes_expired_revocations(client):
+    run(client, revoke, "expired", timedelta(minutes=-5))
+    run(client, revoke, "valid")
+
+    assert run(client, lambda service: service.purge_expired()) == 1
+
+    async def remaining(service: RevocationService) -> list[str]:
+        return (await service.db.execute(select(RevokedToken.jti))).scalars().all()
+
+    assert run(client, remaining) == ["valid"]
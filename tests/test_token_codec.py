@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from jose import JWTError, jwt
+from jose.exceptions import ExpiredSignatureError
+
+from app.services.token_codec import HMACTokenCodec
+
+SECRET = "codec-secret"
+
+
+def test_module_imports_on_its_own():
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.services.token_codec"],
+        cwd=Path(__file__).parent.parent,
+        env=os.environ,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_decodes_tokens_issued_by_jose():
+    claims = {"id": 1, "username": "alice", "exp": int(time.time()) + 60}
+    token = jwt.encode(claims, SECRET, algorithm="HS256")
+
+    assert HMACTokenCodec(SECRET).decode(token) == claims
+
+
+def test_rejects_other_key():
+    token = HMACTokenCodec("other-secret").encode({"id": 1, "exp": int(time.time()) + 60})
+
+    with pytest.raises(JWTError):
+        HMACTokenCodec(SECRET).decode(token)
+
+
+def test_rejects_expired_token():
+    token = HMACTokenCodec(SECRET).encode({"id": 1, "exp": int(time.time()) - 1})
+
+    with pytest.raises(ExpiredSignatureError):
+        HMACTokenCodec(SECRET).decode(token)
+
+
+@pytest.mark.parametrize("exp", ["soon", 1.5, [1]])
+def test_rejects_non_integer_exp(exp):
+    token = HMACTokenCodec(SECRET).encode({"id": 1, "exp": exp})
+
+    with pytest.raises(JWTError) as error:
+        HMACTokenCodec(SECRET).decode(token)
+    assert not isinstance(error.value, ExpiredSignatureError)
@@ -0,0 +1,15 @@
+def register(client, username: str, password: str = "password", **fields) -> dict:
+    user = {"username": username, "first_name": "First", "email": f"{username}@example.com", "password": password}
+    response = client.post("/api/user/register", json={**user, **fields})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def login(client, username: str, password: str = "password") -> dict:
+    response = client.post("/api/auth/login", json={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def query_count(response) -> int:
+    return int(response.headers["X-DB-Query-Count"])